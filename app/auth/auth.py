@@ -5,22 +5,23 @@ from jwt import InvalidTokenError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from starlette.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse,HTMLResponse
 from app.configurations.config import DOMAIN, SECRET_KEY,ALGORITHM
 from app.configurations.database import get_async_session
 from app.configurations.google_config import get_google_login_url, get_google_user_info
+from app.configurations.templates import templates
 from app.models.models import User
+from app.auth.principal import Principal, get_principal
 from app.schemas.schemas import UserLogin, UserRegistration, UserPasswordConfirm
 from app.broker.tasks import send_email
-from app.utils.hashing import verify_password, confirm_password, get_password_hash
+from app.utils.hashing import verify_password_async, confirm_password, get_password_hash_async, needs_rehash
+from app.utils.rate_limit import check_auth_rate, claim_email_send, release_email_send
 from app.utils.jwtConfig import create_access_token, create_email_token, verify_email_token
 
 
-templates = Jinja2Templates(directory="app/templates")
 auth_router = APIRouter(tags=["Registration"],include_in_schema=False)
 async def find_user_by_email(email: str, session: AsyncSession = Depends(get_async_session)):
-    select_query = select(User).where(User.email == email).options(selectinload(User.address),selectinload(User.reports))
+    select_query = select(User).where(User.email == email).options(selectinload(User.address))
     result = await session.execute(select_query)
     user = result.scalar_one_or_none()
     return user
@@ -33,6 +34,8 @@ async def register_page(request: Request):
 @auth_router.post("/register", response_class=HTMLResponse,include_in_schema=False)
 async def register(request: Request, register_user: Annotated[UserRegistration, Depends(UserRegistration.as_form)],
                    session: AsyncSession = Depends(get_async_session)):
+    if limited := await check_auth_rate(request, "register", register_user.email):
+        return limited
     existing_user = await find_user_by_email(register_user.email, session)
     if not confirm_password(register_user.hashed_password,register_user.confirm_password):
         msg = "Passwords do not match"
@@ -41,14 +44,13 @@ async def register(request: Request, register_user: Annotated[UserRegistration,
         msg = "User already exists with same email"
         return templates.TemplateResponse("register.html", {"request": request, "msg": msg})
     if existing_user and existing_user.hashed_password is None:
-        existing_user.hashed_password = get_password_hash(register_user.confirm_password)
+        existing_user.hashed_password = await get_password_hash_async(register_user.confirm_password)
         await session.commit()
         msg = "registered"
         return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
-    html_message = await prepare_email_with_token("verify", register_user.email)
-    send_email.apply_async(args=[[register_user.email], "Verify your email", html_message])
+    await send_token_email("verify", register_user.email)
     msg = "sent"
-    register_user.hashed_password=get_password_hash(register_user.confirm_password)
+    register_user.hashed_password=await get_password_hash_async(register_user.confirm_password)
     user = User(**register_user.model_dump())
     session.add(user)
     await session.commit()
@@ -92,21 +94,26 @@ async def login_page(request: Request, msg: str | None=""):
 @auth_router.post("/login", response_class=HTMLResponse,include_in_schema=False)
 async def login(request: Request, user_login: UserLogin = Depends(UserLogin.as_form),
                 session: AsyncSession = Depends(get_async_session)):
+    if limited := await check_auth_rate(request, "login", user_login.email):
+        return limited
     existing_user = await find_user_by_email(user_login.email, session)
     if existing_user is None:
         msg = "User with this email does not exist"
         return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
-    if not verify_password(plain_password=user_login.password, hashed_password=existing_user.hashed_password):
+    if not await verify_password_async(plain_password=user_login.password, hashed_password=existing_user.hashed_password):
         msg = "Wrong password provided"
         return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
+    if needs_rehash(existing_user.hashed_password):
+        # BCRYPT_ROUNDS changed since this hash was stored; the plain password is only available now
+        existing_user.hashed_password = await get_password_hash_async(user_login.password)
+        await session.commit()
     if existing_user.isVerified:
         access_token = create_access_token(data={"sub": existing_user.email})
         response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
         response.set_cookie("access_token", access_token, httponly=True)
         return response
     msg = "User still not verified.Verification email resend again"
-    html_message = await prepare_email_with_token("verify",existing_user.email)
-    send_email.apply_async(args=[[existing_user.email], "Verify your email", html_message])
+    await send_token_email("verify", existing_user.email)
     return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
 
 
@@ -122,6 +129,18 @@ async def prepare_email_with_token(path:str,email:str):
     return html_message
 
 
+async def send_token_email(path: str, email: str):
+    # Repeated clicks within the cooldown reuse the email already queued for this address
+    if not await claim_email_send(path, email):
+        return
+    try:
+        html_message = await prepare_email_with_token(path, email)
+        send_email.apply_async(args=[[email], "Verify your email", html_message])
+    except Exception:
+        await release_email_send(path, email)
+        raise
+
+
 @auth_router.get("/logout",response_class=HTMLResponse,include_in_schema=False)
 async def logout():
     response = RedirectResponse(url="/auth/login", status_code=status.HTTP_302_FOUND)
@@ -140,20 +159,21 @@ async def resend(request: Request, email: str = Form(), session: AsyncSession =
     if user is None:
         msg = "User with this email does not exist"
         return templates.TemplateResponse("token_expired.html", {"request": request, "msg": msg})
-    html_message=await prepare_email_with_token(path="verify",email=user.email)
-    send_email.apply_async(args=[[user.email], "Verify your email", html_message])
+    await send_token_email("verify", user.email)
     msg = "sent"
     return templates.TemplateResponse("/login.html", {"request": request, "msg": msg})
 
 
 @auth_router.post("/password_confirmed", response_class=HTMLResponse,include_in_schema=False)
 async def confirmed_page(request: Request,user_confirm: UserPasswordConfirm = Depends(UserPasswordConfirm.as_form), session: AsyncSession = Depends(get_async_session)):
+    if limited := await check_auth_rate(request, "password_confirmed", user_confirm.email):
+        return limited
     user = await find_user_by_email(user_confirm.email, session)
     if user is None:
         msg="Token expired"
         return templates.TemplateResponse("token_expired.html", {"request": request, "msg": msg})
     if confirm_password(password1=user_confirm.password1, password2=user_confirm.password2):
-        user.hashed_password = get_password_hash(user_confirm.password1)
+        user.hashed_password = await get_password_hash_async(user_confirm.password1)
         user.isVerified=True
         await session.commit()
         msg = "changed"
@@ -178,8 +198,7 @@ async def resend(request: Request, email: str = Form(), session: AsyncSession =
     if user is None:
         msg = "User with this email does not exist"
         return templates.TemplateResponse("forgot_password.html", {"request": request, "msg": msg})
-    html_message=await prepare_email_with_token(path="recovery",email=user.email)
-    send_email.apply_async(args=[[user.email], "Verify your email", html_message])
+    await send_token_email("recovery", user.email)
     msg = "recovery"
     return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
 @auth_router.get("/verify/{token}", response_class=HTMLResponse,include_in_schema=False)
@@ -228,7 +247,10 @@ async def get_current_user(token: Annotated[str | None, Cookie(alias='access_tok
     except InvalidTokenError:
         user = None
         return user
-    user = await find_user_by_email(email, session)
-    if user is None:
-        user = None
-    return user
\ No newline at end of file
+    return await get_principal(email, session)
+
+
+async def load_current_user(principal: Principal, session: AsyncSession) -> User:
+    select_query = select(User).where(User.id == principal.id).options(selectinload(User.address))
+    result = await session.execute(select_query)
+    return result.scalar_one()
\ No newline at end of file
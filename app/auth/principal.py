@@ -0,0 +1,153 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from app.configurations.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL, PRINCIPAL_REDIS_CACHE, \
+    PRINCIPAL_REDIS_TTL
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import User, Role, StoredImage
+from app.utils.image_variants import pick_variant
+from app.utils.after_commit import dispatch
+
+PRINCIPAL_PREFIX = "principal:"
+# Columns whose change makes a cached principal stale
+PRINCIPAL_FIELDS = ("email", "firstname", "lastname", "role", "photo", "hashed_password", "isVerified", "isActive")
+
+
+class Principal(BaseModel):
+    """What a request needs to know about the logged in user, without any relationships."""
+    id: int
+    email: str
+    firstname: str
+    lastname: str
+    role: Role
+    photo: Optional[str] = None
+    photo_thumb: Optional[str] = None
+    isVerified: bool
+    isActive: bool
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Principal]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Principal):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+
+local_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def principal_key(email: str) -> str:
+    return f"{PRINCIPAL_PREFIX}{email}"
+
+
+async def load_principal(email: str, session: AsyncSession) -> Optional[Principal]:
+    result = await session.execute(
+        select(User.id, User.email, User.firstname, User.lastname, User.role, User.photo,
+               User.isVerified, User.isActive, StoredImage.variants)
+        .outerjoin(StoredImage, StoredImage.path == User.photo)
+        .where(User.email == email)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    fields = dict(row._mapping)
+    variants = fields.pop("variants")
+    return Principal(**fields, photo_thumb=pick_variant(row.photo, variants, "thumb"))
+
+
+async def get_principal(email: str, session: AsyncSession) -> Optional[Principal]:
+    principal = local_cache.get(email)
+    if principal is not None:
+        return principal
+    if PRINCIPAL_REDIS_CACHE:
+        try:
+            cached = await redis_client.get(principal_key(email))
+            if cached is not None:
+                principal = Principal.model_validate_json(cached)
+                local_cache.set(email, principal)
+                return principal
+        except RedisError:
+            pass
+    principal = await load_principal(email, session)
+    if principal is None:
+        return None
+    local_cache.set(email, principal)
+    if PRINCIPAL_REDIS_CACHE:
+        try:
+            await redis_client.set(principal_key(email), principal.model_dump_json(), ex=PRINCIPAL_REDIS_TTL)
+        except RedisError:
+            pass
+    return principal
+
+
+async def invalidate_principals(emails: set[str]):
+    for email in emails:
+        local_cache.pop(email)
+    if PRINCIPAL_REDIS_CACHE:
+        await redis_client.delete(*[principal_key(email) for email in emails])
+
+
+def invalidate_principals_sync(emails: set[str]):
+    for email in emails:
+        local_cache.pop(email)
+    if PRINCIPAL_REDIS_CACHE:
+        sync_redis_client.delete(*[principal_key(email) for email in emails])
+
+
+@event.listens_for(User, "before_update")
+def mark_principal_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    if not any(get_history(target, field).has_changes() for field in PRINCIPAL_FIELDS):
+        return
+    stale = session.info.setdefault("stale_principals", set())
+    stale.add(target.email)
+    # An email change also orphans the entry cached under the old address
+    for old_email in get_history(target, "email").deleted:
+        stale.add(old_email)
+
+
+@event.listens_for(User, "after_delete")
+def mark_deleted_principal_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_principals", set()).add(target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def drop_stale_principals(session):
+    stale = session.info.pop("stale_principals", None)
+    if stale:
+        dispatch(invalidate_principals, invalidate_principals_sync, stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_principals(session):
+    session.info.pop("stale_principals", None)
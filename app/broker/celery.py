@@ -1,5 +1,7 @@
 from celery import Celery
+from celery.schedules import crontab
 import os
+from app.configurations.config import COUNTER_RECONCILE_SECONDS, PDF_PRERENDER_HOUR, HEATMAP_REFRESH_SECONDS
 
 # Ensure REDIS_URL environment variable is loaded
 REDIS_URL = os.getenv("REDIS_URL")
@@ -17,6 +19,25 @@ celery_app.conf.task_routes = {
     "app.broker.tasks.*": {"queue": "default"},
 }
 
+celery_app.conf.beat_schedule = {
+    "reconcile-counters": {
+        "task": "app.broker.tasks.reconcile_counters",
+        "schedule": COUNTER_RECONCILE_SECONDS,
+    },
+    "collect-unreferenced-images": {
+        "task": "app.broker.tasks.collect_unreferenced_images",
+        "schedule": 6 * 60 * 60,
+    },
+    "prerender-daily-pdf": {
+        "task": "app.broker.tasks.prerender_daily_pdf",
+        "schedule": crontab(hour=PDF_PRERENDER_HOUR, minute=0),
+    },
+    "refresh-heatmap-tiles": {
+        "task": "app.broker.tasks.refresh_heatmap_tiles",
+        "schedule": HEATMAP_REFRESH_SECONDS,
+    },
+}
+
 # ⬇️ Import to register tasks
 import app.broker.tasks  # Ensure this line is added to register tasks
 
@@ -1,35 +1,146 @@
 import os
-from asgiref.sync import async_to_sync
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from app.broker.celery import celery_app
-from app.configurations.email_config import create_message, mail
-from PIL import Image
-import os
+from app.configurations.config import IMAGE_BATCH_THREADS
+from app.configurations.database import sync_engine
+from app.utils.categories import load_categories_sync
+from app.utils.counters import reconcile_counters as reconcile_dashboard_counters
+from app.utils.heatmap import refresh_tiles, rebuild_tiles
+from app.utils.image_store import collect_unreferenced, record_variants
+from app.utils.image_variants import render_variants
+from app.utils.pdf_jobs import render_artifact, current_version
+from app.utils.smtp_pool import smtp_pool, build_message
+from app.utils.listeners import register_listeners
+
+# Tasks write through the ORM too, so they need the same listeners as the web app
+register_listeners()
+
+
+@worker_process_init.connect
+def load_report_categories(**kwargs):
+    load_categories_sync()
+
+
+@worker_init.connect
+def load_report_categories_in_worker(**kwargs):
+    # worker_process_init only fires for prefork children; this covers the solo and threads pools
+    load_categories_sync()
+    # Forked children must not inherit the connection used here
+    sync_engine.dispose()
+
+
+@worker_process_shutdown.connect
+def close_smtp_pool(**kwargs):
+    smtp_pool.close()
+
+
 @celery_app.task
 def send_email(recipients: list[str], subject: str, body: str):
     try:
         print("Sending email...")
-        message = create_message(recipients=recipients, subject=subject, body=body)
-        async_to_sync(mail.send_message)(message)
+        smtp_pool.send(build_message(recipients, subject, body))
         print(f"✅ Email sent to {recipients}")
     except Exception as e:
         print(f"❌ Failed to send email to {recipients}: {e}")
 
 
+@celery_app.task
+def send_bulk_email(messages: list[dict]) -> int:
+    # [{"recipients": [...], "subject": ..., "body": ...}, ...] delivered over one SMTP session
+    failed = smtp_pool.send_many(build_message(**message) for message in messages)
+    for message, e in failed:
+        print(f"❌ Failed to send email to {message['To']}: {e}")
+    sent = len(messages) - len(failed)
+    print(f"✅ Bulk email sent: {sent}/{len(messages)}")
+    return sent
+
 
 @celery_app.task
 def process_image(filename: str):
     try:
-        with Image.open(filename) as img:
-            print(f"🖼️ Processing image: {filename}")
-            original_width, original_height = img.size
-            # Determine the smallest side
-            min_side = min(original_width, original_height)
-            # Resize image by equalizing the sides
-            new_size = (min_side, min_side)
-            img = img.resize(new_size)
-            img=img.resize((1024,1024))
-            img.save(filename, optimize=True, quality=85)
-            print(f"✅ Image processed and saved: {filename}")
+        print(f"🖼️ Processing image: {filename}")
+        variants = render_variants(filename)
+        record_variants({filename: variants})
+        print(f"✅ Image variants saved: {filename} ({', '.join(variants)})")
     except Exception as e:
         print(f"❌ Failed to process image {filename}: {e}")
 
+
+@celery_app.task
+def process_images(filenames: list[str]) -> dict[str, str]:
+    # One message per report; Pillow releases the GIL while decoding/encoding, so threads help
+    rendered = {}
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(IMAGE_BATCH_THREADS, len(filenames)) or 1) as executor:
+        futures = {executor.submit(render_variants, filename): filename for filename in filenames}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                rendered[filename] = future.result()
+                results[filename] = "ok"
+            except Exception as e:
+                results[filename] = f"error: {e}"
+                print(f"❌ Failed to process image {filename}: {e}")
+    try:
+        if rendered:
+            record_variants(rendered)
+    except Exception as e:
+        print(f"❌ Failed to record variants for {list(rendered)}: {e}")
+        results.update({filename: f"error: {e}" for filename in rendered})
+    print(f"✅ Processed {len(rendered)}/{len(filenames)} images")
+    return results
+
+
+@celery_app.task
+def reconcile_counters():
+    try:
+        counters = reconcile_dashboard_counters()
+        print(f"✅ Counters reconciled: {counters}")
+    except Exception as e:
+        print(f"❌ Failed to reconcile counters: {e}")
+
+
+@celery_app.task
+def collect_unreferenced_images():
+    try:
+        removed = collect_unreferenced()
+        print(f"✅ Removed {len(removed)} unreferenced images")
+    except Exception as e:
+        print(f"❌ Failed to collect unreferenced images: {e}")
+
+
+@celery_app.task
+def render_report_pdf(window_start: str, max_id: int | None, key: str) -> str:
+    print(f"📄 Rendering report PDF {key}")
+    path = render_artifact(datetime.fromisoformat(window_start), max_id, key)
+    print(f"✅ Report PDF saved: {path}")
+    return path
+
+
+@celery_app.task
+def prerender_daily_pdf():
+    try:
+        start, max_id, key = current_version()
+        render_artifact(start, max_id, key)
+        print(f"✅ Daily report PDF pre-rendered: {key}")
+    except Exception as e:
+        print(f"❌ Failed to pre-render daily report PDF: {e}")
+
+
+@celery_app.task
+def refresh_heatmap_tiles():
+    try:
+        rendered = refresh_tiles()
+        if rendered:
+            print(f"✅ Heatmap tiles refreshed: {rendered}")
+    except Exception as e:
+        print(f"❌ Failed to refresh heatmap tiles: {e}")
+
+
+@celery_app.task
+def rebuild_heatmap_tiles():
+    rendered = rebuild_tiles()
+    print(f"✅ Heatmap tiles rebuilt: {rendered}")
+    return rendered
@@ -8,14 +8,76 @@ POSTGRES_PASSWORD=os.environ.get('POSTGRES_PASSWORD')
 POSTGRES_DB=os.environ.get('POSTGRES_DB')
 DATABASE_URL=os.environ.get('DATABASE_URL')
 REDIS_URL=os.environ.get('REDIS_URL')
+# Engine profile; pool sizes are per process, so multiply by uvicorn/celery workers for the server total
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+# Optional read-only replica for listing and dashboard reads
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 10))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", 5))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", 2))
 ALGORITHM = os.environ.get("ALGORITHM")
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_THREADS = int(os.getenv("BCRYPT_THREADS", 2))
+# Token buckets in front of login/register/password reset
+RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", 20))
+RATE_LIMIT_IP_PER_MINUTE = int(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 10))
+RATE_LIMIT_EMAIL_BURST = int(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+RATE_LIMIT_EMAIL_PER_MINUTE = int(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", 2))
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "true").lower() == "true"
+# Header the proxy in front of the app puts the client address in (nginx resolves CF-Connecting-IP into it)
+CLIENT_IP_HEADER = os.getenv("CLIENT_IP_HEADER", "x-real-ip").lower()
+EMAIL_COOLDOWN_SECONDS = int(os.getenv("EMAIL_COOLDOWN_SECONDS", 120))  # one verification/recovery email per address per window
+COUNTER_RECONCILE_SECONDS = int(os.getenv("COUNTER_RECONCILE_SECONDS", 300))
+RECENT_REPORTS_LIMIT = int(os.getenv("RECENT_REPORTS_LIMIT", 5))
+RECENT_REPORTS_TTL = int(os.getenv("RECENT_REPORTS_TTL", 300))
+TEMPLATE_DIR = os.getenv("TEMPLATE_DIR", "app/templates")
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "app/template_cache")
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "true").lower() == "true"  # false in production skips mtime checks
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 300))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+PRINCIPAL_REDIS_CACHE = os.getenv("PRINCIPAL_REDIS_CACHE", "true").lower() == "true"
+PRINCIPAL_REDIS_TTL = int(os.getenv("PRINCIPAL_REDIS_TTL", 300))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 64 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 2 * 1024 * 1024))  # kept in memory while hashing
+IMAGE_BATCH_THREADS = int(os.getenv("IMAGE_BATCH_THREADS", 4))
+PDF_IMAGE_CONCURRENCY = int(os.getenv("PDF_IMAGE_CONCURRENCY", 8))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "app/pdf_cache")
+PDF_CACHE_TTL = int(os.getenv("PDF_CACHE_TTL", 24 * 60 * 60))
+PDF_PRERENDER_HOUR = int(os.getenv("PDF_PRERENDER_HOUR", 6))
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", 150))
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY", 75))
+MAP_CLUSTER_MAX_ZOOM = int(os.getenv("MAP_CLUSTER_MAX_ZOOM", 14))
+MAP_CLUSTER_CELLS_PER_TILE = int(os.getenv("MAP_CLUSTER_CELLS_PER_TILE", 8))
+MAP_MAX_MARKERS = int(os.getenv("MAP_MAX_MARKERS", 2000))
+HEATMAP_TILE_DIR = os.getenv("HEATMAP_TILE_DIR", "app/tile_cache")
+HEATMAP_MAX_ZOOM = int(os.getenv("HEATMAP_MAX_ZOOM", 12))
+HEATMAP_RADIUS = int(os.getenv("HEATMAP_RADIUS", 8))
+HEATMAP_SATURATION = int(os.getenv("HEATMAP_SATURATION", 25))
+HEATMAP_REFRESH_SECONDS = int(os.getenv("HEATMAP_REFRESH_SECONDS", 60))
+HEATMAP_COARSE_MAX_ZOOM = int(os.getenv("HEATMAP_COARSE_MAX_ZOOM", 7))
+HEATMAP_COARSE_REFRESH_SECONDS = int(os.getenv("HEATMAP_COARSE_REFRESH_SECONDS", 10 * 60))
+HEATMAP_TILE_MAX_AGE = int(os.getenv("HEATMAP_TILE_MAX_AGE", 60))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 100))
+LIVE_KEEPALIVE_SECONDS = int(os.getenv("LIVE_KEEPALIVE_SECONDS", 15))
 
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", 10))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_HTTP_CONNECT_TIMEOUT", 5))
+GOOGLE_HTTP_RETRIES = int(os.getenv("GOOGLE_HTTP_RETRIES", 2))
+GOOGLE_HTTP_BACKOFF = float(os.getenv("GOOGLE_HTTP_BACKOFF", 0.5))  # seconds, doubled per retry
 
 FACEBOOK_CLIENT_ID = os.getenv("FACEBOOK_CLIENT_ID")
 FACEBOOK_CLIENT_SECRET = os.getenv("FACEBOOK_CLIENT_SECRET")
@@ -27,5 +89,12 @@ MAIL_SERVER=os.getenv("MAIL_SERVER")
 MAIL_PORT=int(os.getenv("MAIL_PORT"))
 MAIL_FROM=os.getenv("MAIL_FROM")
 MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME")
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() == "true"
+MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "false").lower() == "true"
+MAIL_VALIDATE_CERTS = os.getenv("MAIL_VALIDATE_CERTS", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", 30))
+SMTP_CHECK_IDLE = int(os.getenv("SMTP_CHECK_IDLE", 30))  # NOOP a session idle longer than this before reuse
+SMTP_MAX_IDLE = int(os.getenv("SMTP_MAX_IDLE", 240))  # most servers drop idle sessions after ~5 minutes
 DOMAIN=os.getenv("DOMAIN")
 FULLDOMAIN=os.getenv("FULLDOMAIN")
\ No newline at end of file
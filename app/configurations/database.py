@@ -1,11 +1,187 @@
-from typing import AsyncGenerator
+import asyncio
+import threading
+import time
+from typing import AsyncGenerator, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError, OperationalError, InterfaceError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from app.configurations.config import DATABASE_URL
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.configurations.config import DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+from app.configurations.config import DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE
+from app.configurations.config import DATABASE_REPLICA_URL, REPLICA_MAX_LAG_SECONDS, REPLICA_CHECK_SECONDS
+from app.configurations.config import REPLICA_CHECK_TIMEOUT
 
-engine = create_async_engine(DATABASE_URL,echo=True)
+
+class PoolWaitStats:
+    """How long checkouts waited for a free connection, since the pool was created.
+
+    Opening new connections (TCP, TLS, auth) is tracked separately, it is not time spent queueing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.connects = 0
+        self.total_connect = 0.0
+        self.max_connect = 0.0
+
+    def record(self, seconds: float, connect_seconds: Optional[float] = None):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if connect_seconds is not None:
+                self.connects += 1
+                self.total_connect += connect_seconds
+                self.max_connect = max(self.max_connect, connect_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            average = self.total_wait / self.checkouts if self.checkouts else 0.0
+            connect_average = self.total_connect / self.connects if self.connects else 0.0
+            return {"checkouts": self.checkouts, "wait_avg_ms": round(average * 1000, 3),
+                    "wait_max_ms": round(self.max_wait * 1000, 3), "connects": self.connects,
+                    "connect_avg_ms": round(connect_average * 1000, 3),
+                    "connect_max_ms": round(self.max_connect * 1000, 3)}
+
+
+class _TimedCheckout:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        # Picked up by the _do_get that opened it, so the connect is not counted as waiting
+        record.info["connect_seconds"] = time.perf_counter() - started
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        record = None
+        try:
+            record = super()._do_get()
+            return record
+        finally:
+            elapsed = time.perf_counter() - started
+            connect = record.info.pop("connect_seconds", None) if record is not None else None
+            self.wait_stats.record(elapsed - (connect or 0.0), connect)
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+POOL_OPTIONS = dict(
+    echo=DB_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+
+
+def create_app_engine(url: str):
+    return create_async_engine(
+        url,
+        poolclass=TimedAsyncQueuePool,
+        # asyncpg prepares every statement; keep the hot ones prepared per connection
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        **POOL_OPTIONS,
+    )
+
+
+engine = create_app_engine(DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engine = create_app_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+replica_session_maker = async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False) \
+    if replica_engine else None
+
+# Celery workers run synchronous code, so they get their own psycopg2 engine
+SYNC_DATABASE_URL = DATABASE_URL.replace("postgresql+asyncpg", "postgresql")
+sync_engine = create_engine(SYNC_DATABASE_URL, **POOL_OPTIONS)
+sync_session_maker = sessionmaker(sync_engine, expire_on_commit=False)
+
+
+def pool_status(pool) -> dict:
+    """Occupancy and checkout wait of one engine's pool in this process."""
+    return {
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **pool.wait_stats.snapshot(),
+    }
+
+
+# Seconds the replica is behind; 0 when it has replayed everything it received or is not in recovery
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaHealth:
+    """Cached replica availability and lag, re-checked at most every REPLICA_CHECK_SECONDS."""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self.checked_at >= REPLICA_CHECK_SECONDS
+
+    async def usable(self) -> bool:
+        if replica_engine is None:
+            return False
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    await self._check()
+        return self.healthy
+
+    async def _lag(self) -> float:
+        async with replica_engine.connect() as connection:
+            return float(await connection.scalar(REPLICA_LAG_QUERY) or 0)
+
+    async def _check(self):
+        try:
+            self.lag = await asyncio.wait_for(self._lag(), REPLICA_CHECK_TIMEOUT)
+            self.healthy = self.lag <= REPLICA_MAX_LAG_SECONDS
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            print(f"❌ Replica check failed, reading from the primary: {e}")
+            self.healthy, self.lag = False, None
+        self.checked_at = time.monotonic()
+
+    def mark_down(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+replica_health = ReplicaHealth()
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only handlers: the replica while it is up and caught up, otherwise the primary."""
+    use_replica = await replica_health.usable()
+    async with (replica_session_maker if use_replica else async_session_maker)() as session:
+        try:
+            yield session
+        except (OperationalError, InterfaceError):
+            if use_replica:
+                replica_health.mark_down()
+            raise
@@ -1,6 +1,57 @@
+import asyncio
+from importlib.util import find_spec
+from typing import Optional
 from urllib.parse import urlencode
 import httpx
 from app.configurations.config import GOOGLE_CLIENT_ID, GOOGLE_REDIRECT_URI, GOOGLE_CLIENT_SECRET
+from app.configurations.config import GOOGLE_HTTP_TIMEOUT, GOOGLE_HTTP_CONNECT_TIMEOUT, GOOGLE_HTTP_RETRIES, GOOGLE_HTTP_BACKOFF
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2 = find_spec("h2") is not None
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_google_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Keep-alive client for Google's OAuth endpoints; pass httpx.MockTransport to test without the network."""
+    if transport is None:
+        # Connection failures never reached Google, so they are safe to retry for any request
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2, retries=GOOGLE_HTTP_RETRIES,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(GOOGLE_HTTP_TIMEOUT, connect=GOOGLE_HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def google_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_google_client()
+    return _client
+
+
+async def close_google_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _get_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    # Only idempotent requests go through here: the authorization code can be exchanged once
+    for attempt in range(GOOGLE_HTTP_RETRIES + 1):
+        try:
+            response = await client.get(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == GOOGLE_HTTP_RETRIES:
+                return response
+        except (httpx.TimeoutException, httpx.NetworkError):
+            if attempt == GOOGLE_HTTP_RETRIES:
+                raise
+        await asyncio.sleep(GOOGLE_HTTP_BACKOFF * 2 ** attempt)
 
 
 def get_google_login_url():
@@ -15,19 +66,19 @@ def get_google_login_url():
     return f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
 
 
-async def get_google_user_info(code: str):
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "code": code,
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "redirect_uri": GOOGLE_REDIRECT_URI,
-                "grant_type": "authorization_code",
-            }, headers={"Content-Type": "application/x-www-form-urlencoded"})
-        token_data = token_resp.json()
-        access_token = token_data.get("access_token")
-        user_resp = await client.get("https://www.googleapis.com/oauth2/v2/userinfo",
-                                     headers={"Authorization": f"Bearer {access_token}"})
-        return user_resp.json()
+async def get_google_user_info(code: str, client: Optional[httpx.AsyncClient] = None):
+    client = client or google_client()
+    token_resp = await client.post(
+        "https://oauth2.googleapis.com/token",
+        data={
+            "code": code,
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "redirect_uri": GOOGLE_REDIRECT_URI,
+            "grant_type": "authorization_code",
+        }, headers={"Content-Type": "application/x-www-form-urlencoded"})
+    token_data = token_resp.json()
+    access_token = token_data.get("access_token")
+    user_resp = await _get_with_retry(client, "https://www.googleapis.com/oauth2/v2/userinfo",
+                                      headers={"Authorization": f"Bearer {access_token}"})
+    return user_resp.json()
@@ -0,0 +1,11 @@
+import redis
+from redis import asyncio as aioredis
+from app.configurations.config import REDIS_URL
+
+# Shared clients: the async one for request handlers, the sync one for Celery workers
+redis_client = aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+sync_redis_client = redis.Redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+
+
+async def get_redis() -> aioredis.Redis:
+    return redis_client
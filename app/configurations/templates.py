@@ -0,0 +1,23 @@
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from starlette.templating import Jinja2Templates
+from app.configurations.config import TEMPLATE_DIR, TEMPLATE_CACHE_DIR, TEMPLATE_AUTO_RELOAD
+
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+
+# One environment for every router, so parsed templates and the bytecode cache are shared
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+)
+templates = Jinja2Templates(env=environment)
+
+
+def precompile_templates() -> int:
+    # Compile everything up front (and write the bytecode cache) instead of on each template's first request
+    names = environment.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        environment.get_template(name)
+    return len(names)
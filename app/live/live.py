@@ -0,0 +1,126 @@
+import asyncio
+from collections import Counter
+from typing import Optional
+import orjson
+from fastapi import APIRouter, Depends, Request, HTTPException, status
+from fastapi.responses import StreamingResponse
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.auth import get_current_user
+from app.auth.principal import Principal
+from app.configurations.config import LIVE_QUEUE_SIZE, LIVE_KEEPALIVE_SECONDS
+from app.configurations.database import get_async_session
+from app.configurations.redis_config import redis_client
+from app.models.models import Report
+from app.utils.counters import counter_deltas
+
+live_router = APIRouter(tags=["Live"])
+LIVE_CHANNEL = "live:events"
+
+
+class Broadcaster:
+    """Fans one Redis subscription per worker process out to every open stream."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.subscribers: set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def _deliver(self, data: str):
+        for queue in list(self.subscribers):
+            if queue.full():
+                # A stalled client loses its oldest event instead of holding everyone back
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _listen(self):
+        while self.subscribers:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    while self.subscribers:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                           timeout=LIVE_KEEPALIVE_SECONDS)
+                        if message is not None:
+                            self._deliver(message["data"])
+            except RedisError as e:
+                print(f"❌ Live subscription failed: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+
+
+broadcaster = Broadcaster(LIVE_CHANNEL)
+
+
+def report_event(report: Report, user: Principal) -> dict:
+    deltas = Counter(counter_deltas(report, 1))
+    for image in report.images:
+        deltas.update(counter_deltas(image, 1))
+    return {
+        "type": "report",
+        "report": {
+            "id": report.id,
+            "title": report.title,
+            "latitude": report.latitude,
+            "longitude": report.longitude,
+            "icon": report.icon,
+            "color": report.color,
+            "created": report.created.isoformat(),
+            "photo": report.images[0].variant_url("thumb") if report.images else None,
+            "user": {"firstname": user.firstname, "lastname": user.lastname,
+                     "photo": user.photo_thumb or user.photo},
+        },
+        "counters": dict(deltas),
+    }
+
+
+async def publish_event(event: dict):
+    try:
+        await redis_client.publish(LIVE_CHANNEL, orjson.dumps(event).decode())
+    except RedisError as e:
+        print(f"❌ Failed to publish live event: {e}")
+
+
+@live_router.get("/stream")
+async def live_stream(
+    request: Request,
+    user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    # The stream never touches the database, give the connection back before it starts
+    await session.close()
+    queue = broadcaster.subscribe()
+
+    async def events():
+        try:
+            yield f"retry: {LIVE_KEEPALIVE_SECONDS * 1000}\n\n"
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {data}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -1,35 +1,44 @@
-from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, Image as PlatypusImage
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import io, aiohttp, os, aiofiles
-from reportlab.pdfgen import canvas as canvas_module
+import os
 from datetime import timedelta
-from collections import defaultdict
 from typing import Annotated, Optional, List
-from uuid import uuid4
 from fastapi import FastAPI, Request, status, Depends, UploadFile, File,HTTPException,Response,Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from celery.result import AsyncResult
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from sqlalchemy import select, func, desc, cast, Date
+from sqlalchemy import select, func, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from starlette.responses import FileResponse
 from starlette.staticfiles import StaticFiles
-from starlette.templating import Jinja2Templates
-from app.configurations.database import get_async_session
+from app.configurations.database import get_async_session, get_read_session, async_session_maker, engine, pool_status
+from app.configurations.database import replica_engine, replica_health
+from app.configurations.google_config import close_google_client
+from app.configurations.templates import templates, precompile_templates
 from app.models.Pagination import get_pagination_params, Pagination
-from app.models.models import User, Address,Report,ImageReport
-from app.schemas.schemas import  AddressForm, ReportForm,ReportRead, GetData, ImageReportCreate
+from app.models.models import User, Address,Report,ImageReport, Role, report_categories
+from app.schemas.schemas import  AddressForm, ReportForm, RecentReport, GetData, ImageReportCreate
 from redis import asyncio as aioredis
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
-from app.auth.auth import auth_router, get_current_user
-from app.broker.tasks import process_image
-from app.configurations.config import FULLDOMAIN
+from app.auth.auth import auth_router, get_current_user, load_current_user
+from app.auth.principal import Principal
+from app.map.map import map_router
+from app.live.live import live_router, broadcaster, publish_event, report_event
+from app.broker.celery import celery_app
+from app.broker.tasks import process_image, process_images, render_report_pdf
+from app.utils.categories import load_categories
+from app.utils.counters import get_dashboard_counters
+from app.utils.dashboard_cache import data_version, dashboard_charts
+from app.utils.recent_reports import get_recent_reports
+from app.utils.uploads import UPLOAD_DIR
+from app.utils.hashing import shutdown_hashing
+from app.utils.image_store import store_upload, unprocessed_images
+from app.utils.rate_limit import rate_limit_stats
+from app.utils.pdf_jobs import find_or_schedule, job_exists
+from app.utils.listeners import register_listeners
+
+register_listeners()
 
 middleware = [
     Middleware(
@@ -44,9 +53,9 @@ middleware = [
 app = FastAPI(middleware=middleware)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(auth_router,prefix="/auth")
-templates = Jinja2Templates(directory="app/templates")
+app.include_router(map_router,prefix="/api/map")
+app.include_router(live_router,prefix="/api/live")
 app.mount("/app/uploads", StaticFiles(directory="app/uploads"), name="uploads")
-UPLOAD_DIR = "app/uploads/"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 favicon_path = "app/uploads/markers/favicon.ico"
 
@@ -55,6 +64,33 @@ favicon_path = "app/uploads/markers/favicon.ico"
 async def startup():
     redis = aioredis.from_url("redis://localhost:6379", encoding="utf-8", decode_responses=True)
     FastAPICache.init(RedisBackend(redis), prefix="cache")
+    async with async_session_maker() as session:
+        await load_categories(session)
+    precompile_templates()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await broadcaster.close()
+    shutdown_hashing()
+    await close_google_client()
+
+@app.get("/metrics/db-pool", include_in_schema=False)
+async def db_pool_metrics(user: Principal = Depends(get_current_user)):
+    if not user or user.role != Role.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    # Per worker process: size pools from in_use / wait figures of each uvicorn worker
+    metrics = {"pid": os.getpid(), "primary": pool_status(engine.pool)}
+    if replica_engine is not None:
+        metrics["replica"] = {**pool_status(replica_engine.pool), "healthy": replica_health.healthy,
+                              "lag_seconds": replica_health.lag}
+    return metrics
+
+@app.get("/metrics/rate-limits", include_in_schema=False)
+async def rate_limit_metrics(user: Principal = Depends(get_current_user)):
+    if not user or user.role != Role.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return await rate_limit_stats()
 
 @app.get('/favicon.ico', include_in_schema=False)
 async def favicon():
@@ -62,142 +98,67 @@ async def favicon():
 
 
 
-async def resize_unique_filename(file: UploadFile):
-    # Read content to measure size
-    content = await file.read()
-    file_size = len(content)
-    max_file_size = 10 * 1024 * 1024  # 10MB
-    if file_size > max_file_size:
-        raise HTTPException(status_code=400, detail="File size exceeds the 5MB limit")
-    ext = os.path.splitext(file.filename)[-1].lower()
-    if ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-        raise HTTPException(status_code=400, detail="Invalid image format")
-    unique_filename = f"{uuid4().hex}{ext}"
-    filepath = os.path.join(UPLOAD_DIR, unique_filename)
-    # Write the file asynchronously
-    async with aiofiles.open(filepath, "wb") as out_file:
-        await out_file.write(content)
-    # Trigger Celery task with the filename only
-    process_image.delay(filepath)
-    return filepath
+async def resize_unique_filename(file: UploadFile) -> str:
+    # Returns the content addressed path
+    return await store_upload(file)
 
 
 
 
-async def get_last_reports(session: AsyncSession = Depends(get_async_session)) -> List[ReportRead]:
-    select_query = (select(Report).options(selectinload(Report.user),selectinload(Report.images)).order_by(desc(Report.created)))
-    result = await session.execute(select_query)
-    reports = result.scalars().all()
-    return [ReportRead.model_validate(rpt) for rpt in reports]
-
-
-async def get_count_of_reports(session: AsyncSession = Depends(get_async_session))->int:
-    total_query = select(func.count()).select_from(Report)
-    result = await session.execute(total_query)
-    return result.scalar_one()
-
-
-async def get_count_of_users(session: AsyncSession = Depends(get_async_session))->int:
-    total_query = select(func.count()).select_from(User)
-    result = await session.execute(total_query)
-    return result.scalar_one()
-
-async def get_image_count(session: AsyncSession = Depends(get_async_session)) -> int:
-    result = await session.execute(select(func.count(ImageReport.id)))
-    return result.scalar_one()
-
-async def get_count_of_suspects(session: AsyncSession = Depends(get_async_session))->int:
-    total_query = select(func.count()).select_from(Report).where(Report.title=="Suspect")
-    result = await session.execute(total_query)
-    return result.scalar_one()
-
-
-async def get_data(count_reports: int = Depends(get_count_of_reports),
-                   reports: List[ReportRead] = Depends(get_last_reports),
+async def get_data(counters: dict = Depends(get_dashboard_counters),
+                   reports: List[RecentReport] = Depends(get_recent_reports),
                    ) -> GetData:
-    return GetData(count_reports=count_reports, reports=reports)
+    return GetData(count_reports=counters["reports"], reports=reports)
 
 
 
-async def get_reports(session: AsyncSession = Depends(get_async_session)):
+async def get_reports(session: AsyncSession = Depends(get_read_session)):
     select_query = select(Report).options(selectinload(Report.user))
     result = await session.execute(select_query)
     return result.scalars().all()
-async def get_data_pie_chart(session: AsyncSession) -> tuple[list[str], list[int], list[str]]:
-    result = await session.execute(
-        select(Report.title, func.count(Report.id), Report.color)
-        .group_by(Report.title, Report.color)
-        .order_by(func.count(Report.id).desc())
-    )
-    rows = result.all()
-    labels = [row[0] for row in rows]
-    values = [row[1] for row in rows]
-    colors = [row[2] if row[2] else '#999999' for row in rows]  # Default to gray if no color
-    return labels, values, colors
-
-async def get_daily_report_titles(session: AsyncSession, days: int = 7):
-    result = await session.execute(
-        select(cast(Report.created, Date), Report.title)
-        .where(Report.created >= date.today() - timedelta(days=days))
-    )
-
-    rows = result.all()
-
-    grouped_titles = defaultdict(lambda: defaultdict(int))  # Nested dictionary for counting titles
-    for created, title in rows:
-        grouped_titles[created.isoformat()][title] += 1
-
-    # Prepare labels, data, and titles for the chart
-    today = date.today()
-    labels = [(today - timedelta(days=i)).isoformat() for i in reversed(range(days))]
-    values = [sum(grouped_titles[day].values()) for day in labels]
-    titles = [grouped_titles.get(day, {}) for day in labels]
-    return labels, values, titles
 @app.get("/", include_in_schema=False)
 async def index_page(
     request: Request,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
     data: GetData = Depends(get_data),
-    count_users:int =Depends(get_count_of_users),
-    count_images:int=Depends(get_image_count),
-    count_suspects:int=Depends(get_count_of_suspects),
-    session: AsyncSession = Depends(get_async_session)):
+    counters: dict = Depends(get_dashboard_counters),
+    days: int = Query(7, ge=1, le=366),
+    version: int = Depends(data_version)):
     if user:
-        labels, values, colors = await get_data_pie_chart(session)  # Now including colors
-        labels1, values1, titles1 = await get_daily_report_titles(session)
+        charts = await dashboard_charts(days, version)
 
         return templates.TemplateResponse("index.html", {
         "request": request,
         "user": user,
-        "reports": data.reports,
+        "recent_reports": data.reports,
         "count_reports": data.count_reports,
-        "count_users": count_users,
-        "count_images": count_images,
-        "labels": labels,
-        "values": values,
-        "colors":colors,
-        "labels1": labels1,
-        "values1": values1,
-        "titles1":titles1,
-        "count_suspects":count_suspects
+        "count_users": counters["users"],
+        "count_images": counters["images"],
+        **charts,
+        "days": days,
+        "count_suspects":counters["suspects"]
     })
     return RedirectResponse(url="/auth/login", status_code=status.HTTP_302_FOUND)
 
 
 
 @app.get("/profile",include_in_schema=False)
-async def profile_page(request: Request, user: User = Depends(get_current_user),
-                       data: GetData = Depends(get_data)):
+async def profile_page(request: Request, user: Principal = Depends(get_current_user),
+                       data: GetData = Depends(get_data),
+                       session: AsyncSession = Depends(get_async_session)):
     if user:
+        full_user = await load_current_user(user, session)
+        reports_done = (await session.execute(
+            select(func.count()).select_from(Report).where(Report.user_id == user.id))).scalar_one()
         return templates.TemplateResponse("profile.html",
-                                          {"request": request, "user": user, "reports": data.reports,
-                                           "count_reports": data.count_reports})
+                                          {"request": request, "user": full_user, "recent_reports": data.reports,
+                                           "count_reports": data.count_reports, "reports_done": reports_done})
     return RedirectResponse(url="/auth/login", status_code=status.HTTP_302_FOUND)
 
 @app.get("/team", response_class=HTMLResponse, include_in_schema=False)
 async def team_page(
     request: Request,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
     datas: GetData = Depends(get_data),
     pagination_params: dict = Depends(get_pagination_params),
 ):
@@ -213,7 +174,7 @@ async def team_page(
         "request": request,
         "user": user,
         "count_reports": datas.count_reports,
-        "reports": datas.reports,
+        "recent_reports": datas.reports,
         "list_users": paginated_data["items"],  # Paginated list of users
         "current_page": paginated_data["page"],  # Current page number
         "total_pages": paginated_data["pages"],  # Total number of pages
@@ -225,9 +186,9 @@ async def team_page(
 @app.get("/report", response_class=HTMLResponse, include_in_schema=False)
 async def report_page(
         request: Request,
-        user: User = Depends(get_current_user),
+        user: Principal = Depends(get_current_user),
         data: GetData = Depends(get_data),
-        session: AsyncSession = Depends(get_async_session)
+        session: AsyncSession = Depends(get_read_session)
 ):
     if user:
         # Get current UTC time and calculate 24 hours ago
@@ -247,7 +208,7 @@ async def report_page(
                 "latitude": r.latitude,
                 "longitude": r.longitude,
                 "icon": r.icon,
-                "images": [{"url": img.url} for img in r.images],  # only URL, not UploadFile
+                "images": [{"url": img.variant_url("popup")} for img in r.images],  # only URL, not UploadFile
             })
 
         return templates.TemplateResponse(
@@ -255,9 +216,10 @@ async def report_page(
             {
                 "request": request,
                 "user": user,
-                "reports": data.reports,
+                "recent_reports": data.reports,
                 "count_reports": data.count_reports,
-                "locations": locations
+                "locations": locations,
+                "categories": list(report_categories)
             }
         )
     return RedirectResponse(url="/auth/login", status_code=status.HTTP_302_FOUND)
@@ -265,28 +227,28 @@ async def report_page(
 
 
 @app.post("/file",response_class=HTMLResponse,include_in_schema=False)
-async def upload_image(photo: Optional[UploadFile] = File(None), user: User = Depends(get_current_user),
+async def upload_image(photo: Optional[UploadFile] = File(None), user: Principal = Depends(get_current_user),
                        session: AsyncSession = Depends(get_async_session)):
     if photo:
         photo_path = await resize_unique_filename(photo)
-        user.photo = photo_path
-        session.add(user)
+        full_user = await load_current_user(user, session)
+        full_user.photo = photo_path
         await session.commit()
-        await session.refresh(user)
+        if await unprocessed_images(session, [photo_path]):
+            process_image.delay(photo_path)
     return RedirectResponse(url="/profile", status_code=status.HTTP_302_FOUND)
 
 
 @app.post("/address", response_class=RedirectResponse,include_in_schema=False)
 async def upload_address(address_create: Annotated[AddressForm, Depends(AddressForm.as_form)],
-                         user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+                         user: Principal = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     if address_create.street and address_create.city and address_create.country:
+        user = await load_current_user(user, session)
         if user.address:
             address_update_dict = address_create.model_dump(exclude_unset=True)
             for key, value in address_update_dict.items():
                 setattr(user.address, key, value)
-            session.add(user)
             await session.commit()
-            await session.refresh(user)
         else:
             address = Address(**address_create.model_dump(), user_id=user.id)
             session.add(address)
@@ -300,19 +262,22 @@ async def upload_address(address_create: Annotated[AddressForm, Depends(AddressF
 async def upload_image(
     create_report: Annotated[ReportForm, Depends(ReportForm.as_form)],
     files: List[UploadFile] = File(None),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded.")
+    if create_report.title not in report_categories:
+        raise HTTPException(status_code=400, detail="Unknown report category.")
 
     # Create report in database
     report = Report(**create_report.model_dump(), user_id=user.id)
+    paths = []
 
     for file in files:
         # Resize and save the image
         try:
-            photo_path = await resize_unique_filename(file)  # Returns unique filename
+            photo_path = await resize_unique_filename(file)  # Returns content addressed filename
         except HTTPException as e:
             raise HTTPException(status_code=e.status_code, detail=e.detail)
 
@@ -321,17 +286,26 @@ async def upload_image(
         image = ImageReport(**create_image.model_dump())
         session.add(image)
         report.images.append(image)
+        paths.append(photo_path)
 
     # Add the report to the session and commit
     session.add(report)
     await session.commit()
+    if report.images:
+        # A duplicate upload may already have variants; new files fall back to the original until processed
+        await session.refresh(report.images[0], ["stored"])
+    await publish_event(report_event(report, user))
+
+    # One Celery message for the whole report; also picks up files whose first upload never got processed
+    if new_images := await unprocessed_images(session, paths):
+        process_images.delay(new_images)
 
     return RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
 
 @app.get("/team", response_class=HTMLResponse, include_in_schema=False)
 async def team_page(
     request: Request,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
     datas: GetData = Depends(get_data),
     pagination_params: dict = Depends(get_pagination_params),
 ):
@@ -350,7 +324,7 @@ async def team_page(
         "request": request,
         "user": user,
         "count_reports": datas.count_reports,
-        "reports": datas.reports,
+        "recent_reports": datas.reports,
         "list_users": paginated_data["items"],  # Paginated list of users
         "current_page": paginated_data["page"],  # Current page number
         "total_pages": paginated_data["pages"],  # Total number of pages
@@ -362,14 +336,14 @@ async def team_page(
 @app.get("/reports", response_class=HTMLResponse, include_in_schema=False, name="reports_page")
 async def reports_page(
         request: Request,
-        user: User = Depends(get_current_user),
+        user: Principal = Depends(get_current_user),
         datas: GetData = Depends(get_data),
         pagination_params: dict = Depends(get_pagination_params),  # Use refactored dependency
         page: int = Query(1, ge=1),
         search: str = Query("", alias="search"),
         sort_by: str = Query("created"),
         sort_order: str = Query("desc"),
-        db: AsyncSession = Depends(get_async_session)
+        db: AsyncSession = Depends(get_read_session)
 ):
     if user:
         # Add db to pagination_params, so it's passed in Pagination
@@ -384,6 +358,7 @@ async def reports_page(
             "request": request,
             "user": user,
             "reports": data["items"],
+            "recent_reports": datas.reports,
             "count_reports": datas.count_reports,
             "search": search,
             "sort_by": sort_by,
@@ -403,9 +378,8 @@ from datetime import datetime, date
 @app.get("/map", response_class=HTMLResponse, include_in_schema=False)
 async def map_page(
     request: Request,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
     data: GetData = Depends(get_data),
-    session: AsyncSession = Depends(get_async_session),
     start_date: datetime = Query(None),
     end_date: datetime = Query(None)
 ):
@@ -413,32 +387,14 @@ async def map_page(
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
     current_date = date.today()
-
-    query = select(Report).options(selectinload(Report.images))
-    if start_date:
-        query = query.where(Report.created >= start_date)
-    if end_date:
-        query = query.where(Report.created <= end_date)
-
-    result = await session.execute(query)
-    locations = result.scalars().all()
-    types = sorted(set(loc.title for loc in locations))
+    # Markers are fetched per viewport from /api/map/reports
+    types = sorted(category.name for category in report_categories)
 
     return templates.TemplateResponse("map.html", {
         "request": request,
-        "locations": [
-            {
-                "name": loc.title,
-                "latitude": loc.latitude,
-                "longitude": loc.longitude,
-                "icon_url": loc.icon,
-                "type": loc.title,
-                "photo": loc.images[0].url if loc.images else "/static/img/default.jpg"
-            } for loc in locations
-        ],
         "types": types,
         "user": user,
-        "reports": data.reports,
+        "recent_reports": data.reports,
         "count_reports": data.count_reports,
         "start_date": start_date,
         "end_date": end_date,
@@ -446,105 +402,34 @@ async def map_page(
     })
 
 
-# Footer function
-def add_footer(canvas: canvas_module.Canvas, doc):
-    page_num_text = f"Page {doc.page}"
-    footer_text = f"Generated by FastAPI • {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
-
-    canvas.saveState()
-    canvas.setFont("Helvetica", 9)
-
-    canvas.drawString(40, 20, footer_text)
-    canvas.drawRightString(A4[0] - 40, 20, page_num_text)
-
-    canvas.restoreState()
-
 @app.get("/generate-pdf")
 async def generate_pdf(session: AsyncSession = Depends(get_async_session)):
-    now = datetime.utcnow()
-    yesterday = now - timedelta(hours=24)
-
-    result = await session.execute(
-        select(Report)
-        .options(selectinload(Report.images))
-        .where(Report.created >= yesterday)
-        .order_by(Report.created.desc())
+    artifact = await find_or_schedule(
+        session, lambda start, max_id, key, job_id: render_report_pdf.apply_async(
+            args=[start, max_id, key], task_id=job_id).id)
+    if artifact.path:
+        return FileResponse(artifact.path, media_type="application/pdf",
+                            headers={"Content-Disposition": "inline; filename=last_24h_reports.pdf"})
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"status": "pending", "job_id": artifact.job_id, "poll_url": f"/generate-pdf/jobs/{artifact.job_id}"},
+        headers={"Retry-After": "5"},
     )
-    reports = result.scalars().unique().all()
-
-    buffer = io.BytesIO()
-
-    # Set up custom template with footer
-    doc = BaseDocTemplate(buffer, pagesize=A4)
-    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height - 20, id="normal")
-    template = PageTemplate(id="footer_template", frames=frame, onPage=add_footer)
-    doc.addPageTemplates([template])
-
-    styles = getSampleStyleSheet()
-    elements = []
-
-    report_count = 0
-    image_count = 0
-
-    elements.append(Paragraph("📄 Reports in the Last 24 Hours", styles["Title"]))
-    elements.append(Spacer(1, 12))
-
-    async with aiohttp.ClientSession() as http_session:
-        for report in reports:
-            report_count += 1
-            data = [
-                ["Title", report.title],
-                ["Location", f"({report.latitude}, {report.longitude})"],
-                ["Created", report.created.strftime('%Y-%m-%d %H:%M:%S')],
-            ]
-            table = Table(data, colWidths=[70 * mm, 100 * mm])
-            table.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 10),
-                ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
-                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 6))
-
-            for image in report.images:
-                if image.url:
-                    try:
-                        async with http_session.get(FULLDOMAIN+image.url) as resp:
-                            if resp.status == 200:
-                                img_data = await resp.read()
-                                img_io = io.BytesIO(img_data)
-                                img = PlatypusImage(img_io, width=80 * mm, height=60 * mm)
-                                elements.append(img)
-                                elements.append(Spacer(1, 6))
-                                image_count += 1
-                            else:
-                                elements.append(Paragraph(f"<i>Image failed: status {resp.status}</i>", styles["Normal"]))
-                    except Exception as e:
-                        elements.append(Paragraph(f"<i>Error loading image: {e}</i>", styles["Normal"]))
-
-            elements.append(Spacer(1, 18))
-
-    elements.append(Paragraph("📊 Summary", styles["Heading2"]))
-    summary_data = [["Total Reports", str(report_count)], ["Total Images", str(image_count)]]
-    summary_table = Table(summary_data, colWidths=[70 * mm, 100 * mm])
-    summary_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-        ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-        ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 11),
-        ("BOX", (0, 0), (-1, -1), 0.5, colors.black),
-        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-    ]))
-    elements.append(summary_table)
-
-    doc.build(elements)
-    buffer.seek(0)
-
-    return Response(
-        content=buffer.read(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "inline; filename=last_24h_reports.pdf"}
-    )
\ No newline at end of file
+
+
+@app.get("/generate-pdf/jobs/{job_id}")
+async def generate_pdf_job(job_id: str):
+    result = AsyncResult(job_id, app=celery_app)
+    if result.successful():
+        if not os.path.exists(result.result):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report PDF expired")
+        return FileResponse(result.result, media_type="application/pdf",
+                            headers={"Content-Disposition": "inline; filename=last_24h_reports.pdf"})
+    if result.failed():
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            content={"status": "failed", "job_id": job_id})
+    # AsyncResult reports PENDING for any id it has never seen
+    if not await job_exists(job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown report job")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "pending", "job_id": job_id},
+                        headers={"Retry-After": "5"})
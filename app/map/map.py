@@ -0,0 +1,205 @@
+import math
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, FileResponse, Response
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.auth import get_current_user
+from app.auth.principal import Principal
+from app.configurations.config import MAP_CLUSTER_MAX_ZOOM, MAP_CLUSTER_CELLS_PER_TILE, MAP_MAX_MARKERS
+from app.configurations.config import HEATMAP_MAX_ZOOM, HEATMAP_TILE_MAX_AGE
+from app.configurations.database import get_read_session
+from app.models.models import Report, ImageReport, StoredImage, report_categories
+from app.utils.heatmap import HEATMAP_WINDOWS, heatmap_categories, tile_path, EMPTY_TILE
+from app.utils.categories import resolve_categories
+from app.utils.image_variants import pick_variant
+from app.utils.spatial import bbox_condition, time_conditions, reports_within
+
+map_router = APIRouter(tags=["Map"])
+DEFAULT_PHOTO = "/static/img/default.jpg"
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if not all(math.isfinite(value) for value in (min_lon, min_lat, max_lon, max_lat)) \
+            or min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    # A map panned past the antimeridian or the poles asks for more than the world; clamp to it
+    return (max(min_lon, -180.0), max(min_lat, -90.0), min(max_lon, 180.0), min(max_lat, 90.0))
+
+
+def cell_size(zoom: int) -> float:
+    # Degrees per cluster cell: a 256px tile spans 360 / 2^zoom degrees of longitude
+    return 360 / (2 ** zoom) / MAP_CLUSTER_CELLS_PER_TILE
+
+
+def report_filters(bbox: tuple[float, float, float, float], start_date: Optional[datetime],
+                   end_date: Optional[datetime], report_type: Optional[str]):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    conditions = [bbox_condition(Report, min_lat, min_lon, max_lat, max_lon),
+                  *time_conditions(Report, start_date, end_date)]
+    if report_type:
+        if report_type not in report_categories:
+            raise HTTPException(status_code=400, detail="Unknown report type")
+        conditions.append(Report.category_id == report_categories.id_for(report_type))
+    return and_(*conditions)
+
+
+def point(lon: float, lat: float, properties: dict) -> dict:
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": properties}
+
+
+async def cluster_features(session: AsyncSession, where, zoom: int) -> list[dict]:
+    size = cell_size(zoom)
+    gx = func.floor(Report.longitude / size).label("gx")
+    gy = func.floor(Report.latitude / size).label("gy")
+    result = await session.execute(
+        select(gx, gy, Report.category_id, func.count(Report.id), func.avg(Report.longitude), func.avg(Report.latitude))
+        .where(where)
+        .group_by(gx, gy, Report.category_id)
+    )
+    rows = result.all()
+    await resolve_categories(session, {row.category_id for row in rows})
+    cells = {}
+    for cell_x, cell_y, category_id, count, lon, lat in rows:
+        cell = cells.setdefault((cell_x, cell_y), {"count": 0, "lon": 0.0, "lat": 0.0, "types": {}})
+        cell["count"] += count
+        cell["lon"] += lon * count
+        cell["lat"] += lat * count
+        cell["types"][report_categories.lookup(category_id).name] = count
+    return [
+        point(cell["lon"] / cell["count"], cell["lat"] / cell["count"],
+              {"cluster": True, "count": cell["count"], "types": cell["types"]})
+        for cell in cells.values()
+    ]
+
+
+async def marker_features(session: AsyncSession, where) -> list[dict]:
+    first_image = (
+        select(ImageReport.url).where(ImageReport.report_id == Report.id)
+        .order_by(ImageReport.id).limit(1).scalar_subquery().label("photo")
+    )
+    result = await session.execute(
+        select(Report.id, Report.title, Report.latitude, Report.longitude, Report.category_id, Report.created,
+               first_image)
+        .where(where)
+        .order_by(Report.created.desc())
+        .limit(MAP_MAX_MARKERS)
+    )
+    rows = result.all()
+    await resolve_categories(session, {row.category_id for row in rows})
+    photos = {row.photo for row in rows if row.photo}
+    variants = {}
+    if photos:
+        stored = await session.execute(select(StoredImage.path, StoredImage.variants).where(StoredImage.path.in_(photos)))
+        variants = dict(stored.all())
+    return [
+        point(row.longitude, row.latitude, {
+            "id": row.id,
+            "name": row.title,
+            "type": report_categories.lookup(row.category_id).name,
+            "icon_url": report_categories.lookup(row.category_id).icon,
+            "created": row.created.isoformat(),
+            "photo": pick_variant(row.photo, variants.get(row.photo), "popup") if row.photo else DEFAULT_PHOTO,
+        })
+        for row in rows
+    ]
+
+
+@map_router.get("/reports", response_class=ORJSONResponse)
+async def map_reports(
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
+    zoom: int = Query(..., ge=0, le=22),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    type: Optional[str] = Query(None, max_length=100),
+    user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    where = report_filters(parse_bbox(bbox), start_date, end_date, type)
+    clustered = zoom < MAP_CLUSTER_MAX_ZOOM
+    features = await cluster_features(session, where, zoom) if clustered else await marker_features(session, where)
+    return ORJSONResponse({"type": "FeatureCollection", "clustered": clustered, "features": features})
+
+
+@map_router.get("/nearby", response_class=ORJSONResponse)
+async def map_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5, gt=0, le=200),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=MAP_MAX_MARKERS),
+    user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    nearby = await reports_within(
+        session,
+        [Report.id, Report.title, Report.latitude, Report.longitude, Report.category_id, Report.created],
+        lat, lon, radius_km, start_date=start_date, end_date=end_date, limit=limit,
+    )
+    await resolve_categories(session, {row.category_id for row, _ in nearby})
+    features = [
+        point(row.longitude, row.latitude, {
+            "id": row.id,
+            "name": row.title,
+            "type": report_categories.lookup(row.category_id).name,
+            "icon_url": report_categories.lookup(row.category_id).icon,
+            "created": row.created.isoformat(),
+            "distance_km": round(distance, 3),
+        })
+        for row, distance in nearby
+    ]
+    return ORJSONResponse({"type": "FeatureCollection", "features": features})
+
+
+@map_router.get("/heatmap", response_class=ORJSONResponse)
+async def heatmap_layer(user: Principal = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return ORJSONResponse({
+        "url": "/api/map/heatmap/{window}/{category}/{z}/{x}/{y}.png",
+        "windows": list(HEATMAP_WINDOWS),
+        "categories": {slug: report_categories.lookup(category_id).name if category_id else "All"
+                       for slug, category_id in heatmap_categories().items()},
+        "maxZoom": HEATMAP_MAX_ZOOM,
+    })
+
+
+@map_router.get("/heatmap/{window}/{category}/{z}/{x}/{y}.png")
+async def heatmap_tile(
+    request: Request,
+    window: str,
+    category: str,
+    z: int,
+    x: int,
+    y: int,
+    user: Principal = Depends(get_current_user),
+):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    if window not in HEATMAP_WINDOWS or category not in heatmap_categories() or not 0 <= z <= HEATMAP_MAX_ZOOM \
+            or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    # Each tile is validated on its own, so a re-render elsewhere leaves cached tiles valid
+    headers = {"Cache-Control": f"private, max-age={HEATMAP_TILE_MAX_AGE}"}
+    path = tile_path(window, category, z, x, y)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        stat_result = None
+    headers["ETag"] = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"' if stat_result else '"empty"'
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if stat_result is None:
+        return Response(EMPTY_TILE, media_type="image/png", headers=headers)
+    return FileResponse(path, media_type="image/png", headers=headers, stat_result=stat_result)
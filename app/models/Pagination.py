@@ -1,12 +1,20 @@
+import base64
+import enum
+import hashlib
+import json
+from datetime import datetime
 from typing import Type, TypeVar, Generic, Optional, List
-from fastapi import Query, Depends
+from fastapi import Query, Depends, HTTPException
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, asc, desc, or_
+from sqlalchemy import select, func, asc, desc, or_, tuple_, text
 from sqlalchemy.orm import selectinload
 
-from app.configurations.database import get_async_session
+from app.configurations.database import get_read_session
+from app.configurations.redis_config import redis_client
 
 ModelType = TypeVar("ModelType")
+COUNT_CACHE_TTL = 60  # seconds a filtered count stays cached in cursor mode
 
 class Pagination(Generic[ModelType]):
     def __init__(
@@ -19,6 +27,9 @@ class Pagination(Generic[ModelType]):
         search_fields: Optional[List[str]] = ["title"],
         sort_by: Optional[str] = "created",
         sort_order: Optional[str] = "desc",
+        cursor: Optional[str] = None,
+        mode: Optional[str] = "page",
+        approximate: bool = True,
     ):
         self.model = model
         self.db = db
@@ -28,8 +39,11 @@ class Pagination(Generic[ModelType]):
         self.search_fields = search_fields
         self.sort_by = sort_by
         self.sort_order = sort_order
+        self.cursor = cursor
+        self.mode = mode
+        self.approximate = approximate
 
-    async def paginate(self) -> dict:
+    def _filtered_query(self):
         base_query = select(self.model)
 
         # Apply search
@@ -41,6 +55,21 @@ class Pagination(Generic[ModelType]):
                     search_conditions.append(column.ilike(f"%{self.search}%"))
             if search_conditions:
                 base_query = base_query.where(or_(*search_conditions))
+        return base_query
+
+    def _with_relationships(self, query):
+        # Apply eager load for relationships
+        if hasattr(self.model, "images") and hasattr(self.model, "user"):
+            query = query.options(selectinload(self.model.images),selectinload(self.model.user))
+        if hasattr(self.model,"address") and hasattr(self.model,"reports"):
+            query=query.options(selectinload(self.model.address),selectinload(self.model.reports))
+        return query
+
+    async def paginate(self) -> dict:
+        if self.mode == "cursor" or self.cursor:
+            return await self.paginate_cursor()
+
+        base_query = self._filtered_query()
 
         # Apply sorting
         sort_column = getattr(self.model, self.sort_by, None)
@@ -53,12 +82,7 @@ class Pagination(Generic[ModelType]):
         total_result = await self.db.execute(count_query)
         total = total_result.scalar()
 
-        # Apply eager load for relationships
-        data_query = base_query
-        if hasattr(self.model, "images") and hasattr(self.model, "user"):
-            data_query = data_query.options(selectinload(self.model.images),selectinload(self.model.user))
-        if hasattr(self.model,"address") and hasattr(self.model,"reports"):
-            data_query=data_query.options(selectinload(self.model.address),selectinload(self.model.reports))
+        data_query = self._with_relationships(base_query)
 
         # Pagination
         offset = (self.page - 1) * self.per_page
@@ -70,8 +94,146 @@ class Pagination(Generic[ModelType]):
             "total": total,
             "page": self.page,
             "pages": (total // self.per_page) + (1 if total % self.per_page else 0),
+            "mode": "page",
         }
 
+    async def paginate_cursor(self) -> dict:
+        """Keyset pagination: seeks on (sort column, id) instead of OFFSET, so deep pages cost the same as the first."""
+        base_query = self._filtered_query()
+        sort_column = getattr(self.model, self.sort_by, None)
+        if sort_column is None:
+            sort_column = self.model.id
+        descending = self.sort_order.lower() != "asc"
+
+        after = None
+        backwards = False
+        if self.cursor:
+            payload = decode_cursor(self.cursor)
+            if payload.get("s") == [self.sort_by, self.sort_order]:
+                after = (_load_value(sort_column, payload["v"]), payload["id"])
+                backwards = payload["d"] == "prev"
+
+        # Walking backwards reads the previous page in reverse order
+        seek_desc = descending != backwards
+        key = tuple_(sort_column, self.model.id)
+        data_query = base_query
+        if after is not None:
+            data_query = data_query.where(key < tuple_(*after) if seek_desc else key > tuple_(*after))
+        if seek_desc:
+            data_query = data_query.order_by(desc(sort_column), desc(self.model.id))
+        else:
+            data_query = data_query.order_by(asc(sort_column), asc(self.model.id))
+
+        result = await self.db.execute(self._with_relationships(data_query).limit(self.per_page + 1))
+        items = result.scalars().all()
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+
+        next_cursor = prev_cursor = None
+        if items:
+            if has_more or backwards:
+                next_cursor = self._cursor_for(items[-1], sort_column, "next")
+            if after is not None and (has_more or not backwards):
+                prev_cursor = self._cursor_for(items[0], sort_column, "prev")
+
+        total = await self.approximate_total(base_query) if self.approximate else None
+        return {
+            "items": items,
+            "total": total,
+            "page": None,
+            "pages": None,
+            "mode": "cursor",
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
+
+    def _cursor_for(self, item, sort_column, direction: str) -> str:
+        return encode_cursor({
+            "s": [self.sort_by, self.sort_order],
+            "v": _dump_value(getattr(item, sort_column.key)),
+            "id": item.id,
+            "d": direction,
+        })
+
+    async def approximate_total(self, base_query) -> Optional[int]:
+        # Unfiltered listings: planner statistics, no table scan at all
+        if not self.search:
+            result = await self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": self.model.__tablename__},
+            )
+            estimate = result.scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+
+        # Searches (or never analyzed tables): exact count, cached for a short while
+        fields = ",".join(self.search_fields or [])
+        key = f"pagination:count:{self.model.__tablename__}:{hashlib.sha1(f'{fields}|{self.search}'.encode()).hexdigest()}"
+        try:
+            cached = await redis_client.get(key)
+            if cached is not None:
+                return int(cached)
+        except RedisError:
+            cached = None
+        total = (await self.db.execute(select(func.count()).select_from(base_query.subquery()))).scalar()
+        try:
+            await redis_client.set(key, total, ex=COUNT_CACHE_TTL)
+        except RedisError:
+            pass
+        return total
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or payload.get("d") not in ("next", "prev"):
+            raise ValueError(cursor)
+        # Everything read below must be here: a crafted cursor is a 400, not a KeyError or a DataError
+        if "v" not in payload or not isinstance(payload["v"], (str, int, float, type(None))) \
+                or not _valid_id(payload.get("id")):
+            raise ValueError(cursor)
+        return payload
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _valid_id(value) -> bool:
+    # Fits the integer primary key; bool is an int subclass but never a valid id
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < 2 ** 31
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _load_value(column, value):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        value = python_type(value)
+        if python_type is int and not -2 ** 63 <= value < 2 ** 63:
+            raise ValueError(value)
+        return value
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # Dependency to inject pagination parameters into the route
 async def get_pagination_params(
     page: int = Query(1, ge=1),
@@ -80,7 +242,9 @@ async def get_pagination_params(
     sort_by: str = Query("created"),
     sort_order: str = Query("desc"),
     search_fields: Optional[List[str]] = Query(["title"]),
-    db: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = Query(None, max_length=512),
+    mode: str = Query("page", pattern="^(page|cursor)$"),
+    db: AsyncSession = Depends(get_read_session),
 ):
     return {
         "db": db,
@@ -90,4 +254,6 @@ async def get_pagination_params(
         "sort_by": sort_by,
         "sort_order": sort_order,
         "search_fields": search_fields,
+        "cursor": cursor,
+        "mode": mode,
     }
@@ -1,9 +1,12 @@
 import enum
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import DateTime, Integer, String, func, Enum, Boolean, event, ForeignKey, Float
+from sqlalchemy import DateTime, Integer, BigInteger, SmallInteger, String, func, Enum, Boolean, event, ForeignKey, Float, Index, JSON
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from zoneinfo import ZoneInfo
+from app.utils.image_variants import pick_variant, variant_sources
+from app.utils.spatial import cell_id
 class Base(DeclarativeBase):
     pass
 
@@ -32,6 +35,88 @@ class Address(Base):
 def israel_now() -> datetime:
     return datetime.now(ZoneInfo("Asia/Jerusalem")).replace(tzinfo=None)
 
+class StoredImage(Base):
+    __tablename__ = "stored_images"
+
+    # Content addressed path (app/uploads/images/<sha[:2]>/<sha256><ext>)
+    path: Mapped[str] = mapped_column(String, primary_key=True)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # {"thumb": {"jpeg": path, "webp": path}, "popup": {...}, "full": {...}} once process_image has run
+    variants: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    updated: Mapped[datetime] = mapped_column(
+        DateTime, default=israel_now, onupdate=israel_now, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<StoredImage(path={self.path}, refcount={self.refcount})>"
+
+class ReportActivityRollup(Base):
+    __tablename__ = "report_activity_rollup"
+
+    # "hour" or "day"; bucket is Report.created truncated to it
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    category_id: Mapped[int] = mapped_column(SmallInteger, ForeignKey("report_categories.id"), primary_key=True)
+    reports: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReportActivityRollup({self.granularity} {self.bucket} {self.category_id}={self.reports})>"
+
+class ReportCategory(Base):
+    __tablename__ = "report_categories"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    icon: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    color: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+
+    def __repr__(self):
+        return f"<ReportCategory(id={self.id}, name={self.name})>"
+
+
+@dataclass(frozen=True)
+class Category:
+    id: int
+    name: str
+    icon: Optional[str]
+    color: Optional[str]
+
+
+class CategoryRegistry:
+    """In-process copy of report_categories, filled at startup by app.utils.categories."""
+
+    def __init__(self):
+        self.by_id: dict[int, Category] = {}
+        self.by_name: dict[str, Category] = {}
+
+    def replace(self, categories: List[Category]):
+        self.by_id = {category.id: category for category in categories}
+        self.by_name = {category.name: category for category in categories}
+
+    def get(self, category_id: Optional[int]) -> Optional[Category]:
+        return self.by_id.get(category_id)
+
+    def lookup(self, category_id: int) -> Category:
+        # Never None: an id this process has not loaded yet gets a placeholder instead of an AttributeError
+        return self.by_id.get(category_id) or Category(category_id, f"Category {category_id}", None, None)
+
+    def id_for(self, name: str) -> int:
+        category = self.by_name.get(name)
+        if category is None:
+            raise ValueError(f"Unknown report category: {name}")
+        return category.id
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+
+report_categories = CategoryRegistry()
+SUSPECT_CATEGORY = "Suspect"
+
+
 class ImageReport(Base):
     __tablename__ = "images"
 
@@ -40,16 +125,31 @@ class ImageReport(Base):
     report_id: Mapped[int] = mapped_column(ForeignKey("reports.id"))
     # Many-to-one relationship
     report: Mapped["Report"] = relationship(back_populates="images")
+    stored: Mapped[Optional["StoredImage"]] = relationship(
+        primaryjoin="foreign(ImageReport.url) == StoredImage.path", viewonly=True, lazy="selectin"
+    )
+
+    def variant_url(self, name: str, fmt: Optional[str] = None) -> Optional[str]:
+        return pick_variant(self.url, self.stored.variants if self.stored else None, name, fmt)
+
+    def variant_sources(self, name: str) -> list[tuple[str, str]]:
+        return variant_sources(self.stored.variants if self.stored else None, name)
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_created_id", "created", "id"),
+        Index("ix_reports_cell_created", "cell", "created"),
+        Index("ix_reports_category_created", "category_id", "created"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
     images: Mapped[List["ImageReport"]] = relationship(back_populates="report", cascade="all, delete-orphan")
     latitude: Mapped[float] = mapped_column(Float, nullable=False)
     longitude: Mapped[float] = mapped_column(Float, nullable=False)
-    icon: Mapped[str] = mapped_column(String, nullable=True)
-    color: Mapped[str] = mapped_column(String, nullable=True)
+    # Grid cell of (latitude, longitude), see app.utils.spatial
+    cell: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    category_id: Mapped[int] = mapped_column(SmallInteger, ForeignKey("report_categories.id"), nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship(back_populates="reports")
     created: Mapped[datetime] = mapped_column(
@@ -59,39 +159,32 @@ class Report(Base):
         DateTime, default=israel_now, onupdate=israel_now
     )
 
-    def __repr__(self):
-        return f"<Report(id={self.id}, content={self.title})>"
+    @property
+    def icon(self) -> Optional[str]:
+        category = report_categories.get(self.category_id)
+        return category.icon if category else None
 
-suspect = "app/uploads/markers/suspect.ico"
-civil="app/uploads/markers/civil.ico"
-un_solder="app/uploads/markers/un_solder.ico"
-leb_solder="app/uploads/markers/leb_solder.ico"
+    @property
+    def color(self) -> Optional[str]:
+        category = report_categories.get(self.category_id)
+        return category.color if category else None
 
+    def __repr__(self):
+        return f"<Report(id={self.id}, content={self.title})>"
 
 @event.listens_for(Report, "before_insert")
-def change_before_insert(mapper, connection, target):
-    if target.title == "Civilian":
-        target.icon = civil
-    elif target.title == "Suspect":
-        target.icon = suspect
-    elif target.title == "Lebanon Forces":
-        target.icon=leb_solder
-    elif target.title == "UN Forces":
-        target.icon=un_solder
+@event.listens_for(Report, "before_update")
+def set_report_cell(mapper, connection, target):
+    target.cell = cell_id(target.latitude, target.longitude)
 @event.listens_for(Report, "before_insert")
-def insert_before_color(mapper,connection,target):
-    if target.title == "Civilian":
-        target.color ="#1dff16"
-    elif target.title == "Suspect":
-        target.color ="#fd0808"
-    elif target.title == "Lebanon Forces":
-        target.color ="#232222"
-    elif target.title == "UN Forces":
-        target.color ="rgba(56,168,248,0.6)"
+def set_report_category(mapper, connection, target):
+    if target.category_id is None:
+        target.category_id = report_categories.id_for(target.title)
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_id", "created", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     email: Mapped[str] = mapped_column(String(255), nullable=False, unique=True, index=True)
@@ -104,6 +197,9 @@ class User(Base):
     photo: Mapped[str] = mapped_column(String, nullable=True)
     address: Mapped[Optional["Address"]] = relationship(back_populates="user", uselist=False)
     reports: Mapped[List["Report"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    photo_store: Mapped[Optional["StoredImage"]] = relationship(
+        primaryjoin="foreign(User.photo) == StoredImage.path", viewonly=True, lazy="selectin"
+    )
     created: Mapped[datetime] = mapped_column(
         DateTime, default=israel_now, nullable=False, index=True
     )
@@ -112,6 +208,9 @@ class User(Base):
     )
     def __repr__(self):
         return f"<User(id={self.id}, name={self.email})>"
+
+    def photo_variant(self, name: str, fmt: Optional[str] = None) -> Optional[str]:
+        return pick_variant(self.photo, self.photo_store.variants if self.photo_store else None, name, fmt)
     # @staticmethod
     # def calculate_age(birthday:datetime)->int:
     #     today = datetime.today().date()
@@ -159,8 +159,19 @@ class ReportForm(BaseModel):
                 ):
         return cls(title=title,latitude=latitude, longitude=longitude)
 
+class RecentReportUser(BaseModel):
+    photo: Optional[str] = None
+    firstname: str
+    lastname: str
+
+class RecentReport(BaseModel):
+    id: int
+    title: str
+    created: datetime
+    user: RecentReportUser
+
 class GetData(BaseModel):
     count_reports:int
-    reports:List[ReportRead]=Field(default_factory=list)
+    reports:List[RecentReport]=Field(default_factory=list)
 
 
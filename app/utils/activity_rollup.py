@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, event, delete, insert, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.configurations.database import sync_session_maker
+from app.models.models import Report, ReportActivityRollup, report_categories
+from app.utils.categories import resolve_categories
+
+GRANULARITIES = ("hour", "day")
+
+
+def bucket(created: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return created.replace(minute=0, second=0, microsecond=0)
+    return created.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bump(connection, target: Report, delta: int):
+    # Runs inside the flush, so the rollup commits or rolls back with the report itself
+    statement = pg_insert(ReportActivityRollup).values([
+        {"granularity": granularity, "bucket": bucket(target.created, granularity),
+         "category_id": target.category_id, "reports": delta}
+        for granularity in GRANULARITIES
+    ])
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[ReportActivityRollup.granularity, ReportActivityRollup.bucket,
+                        ReportActivityRollup.category_id],
+        set_={"reports": ReportActivityRollup.reports + statement.excluded.reports},
+    ))
+
+
+@event.listens_for(Report, "after_insert")
+def count_report(mapper, connection, target):
+    _bump(connection, target, 1)
+
+
+@event.listens_for(Report, "after_delete")
+def uncount_report(mapper, connection, target):
+    _bump(connection, target, -1)
+
+
+async def category_totals(session: AsyncSession) -> tuple[list[str], list[int], list[str]]:
+    total = func.sum(ReportActivityRollup.reports)
+    result = await session.execute(
+        select(ReportActivityRollup.category_id, total)
+        .where(ReportActivityRollup.granularity == "day")
+        .group_by(ReportActivityRollup.category_id)
+        .having(total > 0)
+        .order_by(total.desc())
+    )
+    result = result.all()
+    await resolve_categories(session, {category_id for category_id, _ in result})
+    rows = [(report_categories.lookup(category_id), int(reports)) for category_id, reports in result]
+    labels = [category.name for category, _ in rows]
+    values = [reports for _, reports in rows]
+    colors = [category.color or '#999999' for category, _ in rows]  # Default to gray if no color
+    return labels, values, colors
+
+
+async def daily_activity(session: AsyncSession, days: int = 7) -> tuple[list[str], list[int], list[dict]]:
+    """Per-day totals and per-category counts for the last `days` days, oldest first."""
+    today = date.today()
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    result = await session.execute(
+        select(ReportActivityRollup.bucket, ReportActivityRollup.category_id, ReportActivityRollup.reports)
+        .where(ReportActivityRollup.granularity == "day", ReportActivityRollup.bucket >= start,
+               ReportActivityRollup.reports > 0)
+    )
+    result = result.all()
+    await resolve_categories(session, {category_id for _, category_id, _ in result})
+    grouped_titles = defaultdict(dict)
+    for day, category_id, reports in result:
+        grouped_titles[day.date().isoformat()][report_categories.lookup(category_id).name] = reports
+
+    labels = [(today - timedelta(days=i)).isoformat() for i in reversed(range(days))]
+    values = [sum(grouped_titles[day].values()) for day in labels]
+    titles = [grouped_titles.get(day, {}) for day in labels]
+    return labels, values, titles
+
+
+def backfill():
+    """Rebuild the rollup from the reports table."""
+    with sync_session_maker() as session:
+        session.execute(delete(ReportActivityRollup))
+        for granularity in GRANULARITIES:
+            truncated = func.date_trunc(granularity, Report.created)
+            session.execute(insert(ReportActivityRollup).from_select(
+                ["granularity", "bucket", "category_id", "reports"],
+                select(literal(granularity), truncated, Report.category_id, func.count(Report.id))
+                .group_by(truncated, Report.category_id),
+            ))
+        session.commit()
+
+
+if __name__ == "__main__":
+    backfill()
+    print("✅ Report activity rollup rebuilt")
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Awaitable, Callable
+from redis.exceptions import RedisError
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def dispatch(async_effect: Callable[..., Awaitable], sync_effect: Callable, *args):
+    """Run a post-commit side effect without blocking the committing session.
+
+    Sessions driven by an event loop (request handlers) get a fire-and-forget task,
+    synchronous sessions (Celery workers, scripts) run the sync variant inline.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            sync_effect(*args)
+        except RedisError as e:
+            print(f"❌ Post-commit {sync_effect.__name__} failed: {e}")
+        return
+    task = loop.create_task(_guarded(async_effect, *args))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _guarded(async_effect: Callable[..., Awaitable], *args):
+    try:
+        await async_effect(*args)
+    except RedisError as e:
+        print(f"❌ Post-commit {async_effect.__name__} failed: {e}")
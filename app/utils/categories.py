@@ -0,0 +1,28 @@
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.configurations.database import sync_session_maker
+from app.models.models import ReportCategory, Category, report_categories
+
+CATEGORY_QUERY = select(ReportCategory.id, ReportCategory.name, ReportCategory.icon, ReportCategory.color) \
+    .order_by(ReportCategory.id)
+
+
+async def load_categories(session: AsyncSession):
+    result = await session.execute(CATEGORY_QUERY)
+    report_categories.replace([Category(*row) for row in result])
+
+
+async def resolve_categories(session: AsyncSession, category_ids: Iterable[int]):
+    """Reload the registry when rows reference a category added after it was loaded."""
+    if any(category_id not in report_categories.by_id for category_id in category_ids):
+        await load_categories(session)
+
+
+def load_categories_sync():
+    with sync_session_maker() as session:
+        report_categories.replace([Category(*row) for row in session.execute(CATEGORY_QUERY)])
+
+
+def category_slug(name: str) -> str:
+    return name.lower().replace(" ", "-")
@@ -0,0 +1,148 @@
+import asyncio
+from collections import Counter, defaultdict
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.configurations.database import get_async_session, sync_session_maker
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import Report, User, ImageReport, ReportCategory, SUSPECT_CATEGORY, report_categories
+from app.utils.after_commit import dispatch
+
+COUNTER_PREFIX = "counter:"
+COUNTER_LOCK_TTL = 10  # seconds a recompute may hold the lock
+COUNTER_WAIT_STEPS = 50  # 50 * 0.1s waiting for another worker's recompute
+
+# Source of truth for every dashboard counter
+COUNTER_QUERIES = {
+    "reports": select(func.count()).select_from(Report),
+    "users": select(func.count()).select_from(User),
+    "images": select(func.count(ImageReport.id)),
+    # Category id resolved once per query, then counted from the (category_id, created) index
+    "suspects": select(func.count()).select_from(Report).where(
+        Report.category_id == select(ReportCategory.id).where(ReportCategory.name == SUSPECT_CATEGORY).scalar_subquery()
+    ),
+}
+
+# Only increment counters that already exist; a missing counter is recomputed from Postgres
+INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+_recompute_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+def counter_key(name: str) -> str:
+    return f"{COUNTER_PREFIX}{name}"
+
+
+def counter_deltas(target, sign: int) -> dict[str, int]:
+    if isinstance(target, Report):
+        deltas = {"reports": sign}
+        suspect = report_categories.by_name.get(SUSPECT_CATEGORY)
+        if suspect and target.category_id == suspect.id:
+            deltas["suspects"] = sign
+        return deltas
+    if isinstance(target, User):
+        return {"users": sign}
+    if isinstance(target, ImageReport):
+        return {"images": sign}
+    return {}
+
+
+def _record(target, sign: int):
+    session = object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault("counter_deltas", Counter())
+    pending.update(counter_deltas(target, sign))
+
+
+def _after_insert(mapper, connection, target):
+    _record(target, 1)
+
+
+def _after_delete(mapper, connection, target):
+    _record(target, -1)
+
+
+for _model in (Report, User, ImageReport):
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_counter_deltas(session):
+    deltas = {name: delta for name, delta in session.info.pop("counter_deltas", Counter()).items() if delta}
+    if deltas:
+        dispatch(apply_deltas, apply_deltas_sync, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_counter_deltas(session):
+    session.info.pop("counter_deltas", None)
+
+
+async def apply_deltas(deltas: dict[str, int]):
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for name, delta in deltas.items():
+            pipe.eval(INCR_IF_EXISTS, 1, counter_key(name), delta)
+        await pipe.execute()
+
+
+def apply_deltas_sync(deltas: dict[str, int]):
+    with sync_redis_client.pipeline(transaction=False) as pipe:
+        for name, delta in deltas.items():
+            pipe.eval(INCR_IF_EXISTS, 1, counter_key(name), delta)
+        pipe.execute()
+
+
+async def _recompute(name: str, session: AsyncSession) -> int:
+    key = counter_key(name)
+    # Single flight: one coroutine per process, one process across the cluster
+    async with _recompute_locks[name]:
+        value = await redis_client.get(key)
+        if value is not None:
+            return int(value)
+        lock_key = f"{key}:lock"
+        if await redis_client.set(lock_key, 1, nx=True, ex=COUNTER_LOCK_TTL):
+            try:
+                value = (await session.execute(COUNTER_QUERIES[name])).scalar_one()
+                await redis_client.set(key, value)
+                return value
+            finally:
+                await redis_client.delete(lock_key)
+        for _ in range(COUNTER_WAIT_STEPS):
+            await asyncio.sleep(0.1)
+            value = await redis_client.get(key)
+            if value is not None:
+                return int(value)
+        return (await session.execute(COUNTER_QUERIES[name])).scalar_one()
+
+
+async def get_counters(session: AsyncSession) -> dict[str, int]:
+    names = list(COUNTER_QUERIES)
+    try:
+        values = await redis_client.mget([counter_key(name) for name in names])
+        counters = {}
+        for name, value in zip(names, values):
+            counters[name] = int(value) if value is not None else await _recompute(name, session)
+        return counters
+    except RedisError:
+        # Redis is down: fall back to counting in Postgres
+        return {name: (await session.execute(query)).scalar_one() for name, query in COUNTER_QUERIES.items()}
+
+
+async def get_dashboard_counters(session: AsyncSession = Depends(get_async_session)) -> dict[str, int]:
+    return await get_counters(session)
+
+
+def reconcile_counters() -> dict[str, int]:
+    with sync_session_maker() as session:
+        counters = {name: session.execute(query).scalar_one() for name, query in COUNTER_QUERIES.items()}
+    sync_redis_client.mset({counter_key(name): value for name, value in counters.items()})
+    return counters
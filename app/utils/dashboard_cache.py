@@ -0,0 +1,72 @@
+from datetime import date
+import orjson
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.configurations.config import DASHBOARD_CACHE_TTL
+from app.configurations.database import async_session_maker
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import Report
+from app.utils.activity_rollup import category_totals, daily_activity
+from app.utils.after_commit import dispatch
+
+DASHBOARD_PREFIX = "dashboard:"
+DATA_VERSION_KEY = "dashboard:data_version"
+
+
+async def data_version() -> int:
+    try:
+        return int(await redis_client.get(DATA_VERSION_KEY) or 0)
+    except RedisError:
+        return 0
+
+
+async def dashboard_charts(days: int, version: int) -> dict:
+    """Chart data for the index page, cached per data version so the rollup is only read on a miss."""
+    key = f"{DASHBOARD_PREFIX}{version}:{days}:{date.today().isoformat()}"
+    try:
+        cached = await redis_client.get(key)
+    except RedisError:
+        cached = None
+    if cached is not None:
+        return orjson.loads(cached)
+    # Misses read the primary: a lagging replica could otherwise be cached under the new version
+    async with async_session_maker() as session:
+        labels, values, colors = await category_totals(session)
+        labels1, values1, titles1 = await daily_activity(session, days)
+    charts = {"labels": labels, "values": values, "colors": colors,
+              "labels1": labels1, "values1": values1, "titles1": titles1}
+    try:
+        await redis_client.set(key, orjson.dumps(charts), ex=DASHBOARD_CACHE_TTL)
+    except RedisError:
+        pass
+    return charts
+
+
+async def bump_data_version():
+    await redis_client.incr(DATA_VERSION_KEY)
+
+
+def bump_data_version_sync():
+    sync_redis_client.incr(DATA_VERSION_KEY)
+
+
+def _mark_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["dashboard_stale"] = True
+
+
+event.listen(Report, "after_insert", _mark_stale)
+event.listen(Report, "after_delete", _mark_stale)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_data_version(session):
+    if session.info.pop("dashboard_stale", False):
+        dispatch(bump_data_version, bump_data_version_sync)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_data_version(session):
+    session.info.pop("dashboard_stale", None)
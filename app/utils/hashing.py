@@ -1,14 +1,41 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
+from app.configurations.config import BCRYPT_ROUNDS, BCRYPT_THREADS
+
+# bcrypt releases the GIL, so a few threads keep the event loop free without oversubscribing the CPU
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_THREADS, thread_name_prefix="bcrypt")
 
 def confirm_password(password1:str,password2:str):
     return password1 == password2
 
 # Hash a password
-def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
+def get_password_hash(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 # Verify password
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+def verify_password(plain_password: str, hashed_password: str | None) -> bool:
+    if not hashed_password:
+        return False
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    # $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str | None) -> bool:
+    if not hashed_password:
+        return False
+    return await asyncio.get_running_loop().run_in_executor(_executor, verify_password, plain_password,
+                                                            hashed_password)
+
+def shutdown_hashing():
+    _executor.shutdown(wait=False, cancel_futures=True)
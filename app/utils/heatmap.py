@@ -0,0 +1,329 @@
+import io
+import math
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+from PIL import Image
+from sqlalchemy import select, event, or_, and_
+from sqlalchemy.orm import Session, object_session
+from app.configurations.config import HEATMAP_TILE_DIR, HEATMAP_MAX_ZOOM, HEATMAP_RADIUS, HEATMAP_SATURATION
+from app.configurations.config import HEATMAP_COARSE_MAX_ZOOM, HEATMAP_COARSE_REFRESH_SECONDS
+from app.configurations.database import sync_session_maker
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import Report, israel_now, report_categories
+from app.utils.after_commit import dispatch
+from app.utils.categories import category_slug
+from app.utils.spatial import bbox_condition
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.05112878  # Web Mercator cut-off
+# Two box blurs reach 2 * radius pixels, so points that far outside a tile still colour it
+BLUR_EXTENT = 2 * HEATMAP_RADIUS
+HEATMAP_WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "all": None,
+}
+DIRTY_KEY = "heatmap:dirty"
+COARSE_DIRTY_KEY = "heatmap:dirty:coarse"
+LAST_RUN_KEY = "heatmap:last_run"
+COARSE_LAST_RUN_KEY = "heatmap:coarse_last_run"
+LOCK_KEY = "heatmap:lock"
+LOCK_TTL = 10 * 60
+DIRTY_BATCH = 500
+# Only the run that took the lock may release it: an overrunning run must not free its successor's lock
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def heatmap_categories() -> dict[str, Optional[int]]:
+    # Tile path segment -> category id, None for every category
+    return {"all": None, **{category_slug(category.name): category.id for category in report_categories}}
+
+
+def tile_path(window: str, category: str, z: int, x: int, y: int) -> str:
+    return os.path.join(HEATMAP_TILE_DIR, window, category, str(z), str(x), f"{y}.png")
+
+
+def pixel_coordinates(latitudes: np.ndarray, longitudes: np.ndarray, zoom: int) -> tuple[np.ndarray, np.ndarray]:
+    # Global Web Mercator pixel position at the given zoom
+    scale = TILE_SIZE * 2 ** zoom
+    lat = np.radians(np.clip(latitudes, -MAX_LATITUDE, MAX_LATITUDE))
+    px = (longitudes + 180) / 360 * scale
+    py = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * scale
+    return px, py
+
+
+def pixel_to_lat_lon(px: float, py: float, zoom: int) -> tuple[float, float]:
+    scale = TILE_SIZE * 2 ** zoom
+    lon = px / scale * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * py / scale))))
+    return lat, lon
+
+
+def touched_tiles(latitudes: np.ndarray, longitudes: np.ndarray) -> set[tuple[int, int, int]]:
+    """Every (z, x, y) tile whose pixels a point at these coordinates can colour."""
+    tiles = set()
+    if not len(latitudes):
+        return tiles
+    offsets = (-BLUR_EXTENT, 0, BLUR_EXTENT)
+    for zoom in range(HEATMAP_MAX_ZOOM + 1):
+        count = 2 ** zoom
+        px, py = pixel_coordinates(latitudes, longitudes, zoom)
+        for dx in offsets:
+            xs = ((px + dx) // TILE_SIZE).astype(np.int64) % count
+            for dy in offsets:
+                ys = np.clip((py + dy) // TILE_SIZE, 0, count - 1).astype(np.int64)
+                pairs = np.unique(np.stack([xs, ys], axis=1), axis=0)
+                tiles.update((zoom, int(x), int(y)) for x, y in pairs)
+    return tiles
+
+
+def _box_blur(grid: np.ndarray, radius: int) -> np.ndarray:
+    width = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(radius + 1, radius) if a == axis else (0, 0) for a in (0, 1)]
+        summed = np.cumsum(np.pad(grid, pad), axis=axis)
+        length = summed.shape[axis]
+        grid = (np.take(summed, np.arange(width, length), axis=axis)
+                - np.take(summed, np.arange(0, length - width), axis=axis)) / width
+    return grid
+
+
+def _color_ramp() -> np.ndarray:
+    stops = [0.0, 0.25, 0.5, 0.75, 1.0]
+    colors = np.array([
+        (0, 0, 255, 0),
+        (0, 128, 255, 140),
+        (0, 255, 0, 170),
+        (255, 255, 0, 200),
+        (255, 0, 0, 230),
+    ], dtype=np.float64)
+    levels = np.linspace(0, 1, 256)
+    return np.stack([np.interp(levels, stops, colors[:, channel]) for channel in range(4)], axis=1).astype(np.uint8)
+
+
+COLOR_RAMP = _color_ramp()
+# Blurred value at the centre of a single isolated report
+POINT_PEAK = 1 / (2 * HEATMAP_RADIUS + 1) ** 2
+
+
+def render_heat(px: np.ndarray, py: np.ndarray) -> Optional[Image.Image]:
+    """Heat tile for points given in tile-local pixels, None when nothing would be visible."""
+    size = TILE_SIZE + 2 * BLUR_EXTENT
+    grid = np.zeros((size, size), dtype=np.float64)
+    cols = np.floor(px).astype(np.int64) + BLUR_EXTENT
+    rows = np.floor(py).astype(np.int64) + BLUR_EXTENT
+    inside = (cols >= 0) & (cols < size) & (rows >= 0) & (rows < size)
+    np.add.at(grid, (rows[inside], cols[inside]), 1)
+    if not grid.any():
+        return None
+    heat = _box_blur(_box_blur(grid, HEATMAP_RADIUS), HEATMAP_RADIUS)
+    heat = heat[BLUR_EXTENT:BLUR_EXTENT + TILE_SIZE, BLUR_EXTENT:BLUR_EXTENT + TILE_SIZE]
+    # Log scale so a single report is visible and HEATMAP_SATURATION overlapping reports is full red
+    intensity = np.clip(np.log1p(heat / POINT_PEAK) / np.log1p(HEATMAP_SATURATION), 0, 1)
+    if intensity.max() < 1 / 255:
+        return None
+    return Image.fromarray(COLOR_RAMP[(intensity * 255).astype(np.uint8)], "RGBA")
+
+
+def _empty_tile() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (TILE_SIZE, TILE_SIZE)).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+# Served where a tile has no reports
+EMPTY_TILE = _empty_tile()
+
+
+def _save_tile(image: Optional[Image.Image], path: str):
+    if image is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.part"
+    image.save(temp_path, format="PNG", optimize=True)
+    os.replace(temp_path, path)
+
+
+@dataclass
+class HeatPoints:
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    category_ids: np.ndarray
+    created: np.ndarray
+
+    def select(self, mask: np.ndarray) -> "HeatPoints":
+        return HeatPoints(self.latitudes[mask], self.longitudes[mask], self.category_ids[mask], self.created[mask])
+
+
+def _load_points(session: Session, *conditions) -> HeatPoints:
+    rows = session.execute(
+        select(Report.latitude, Report.longitude, Report.category_id, Report.created).where(*conditions)
+    ).all()
+    return HeatPoints(
+        np.fromiter((row.latitude for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row.longitude for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row.category_id for row in rows), dtype=np.int16, count=len(rows)),
+        np.array([row.created for row in rows], dtype="datetime64[us]"),
+    )
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of everything that can colour the tile, blur included."""
+    min_lat, min_lon = pixel_to_lat_lon(x * TILE_SIZE - BLUR_EXTENT, (y + 1) * TILE_SIZE + BLUR_EXTENT, z)
+    max_lat, max_lon = pixel_to_lat_lon((x + 1) * TILE_SIZE + BLUR_EXTENT, y * TILE_SIZE - BLUR_EXTENT, z)
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def _render_points(points: HeatPoints, z: int, x: int, y: int, now: datetime):
+    """Re-render one tile position for every window and category."""
+    px, py = pixel_coordinates(points.latitudes, points.longitudes, z)
+    px -= x * TILE_SIZE
+    py -= y * TILE_SIZE
+    for window, span in HEATMAP_WINDOWS.items():
+        in_window = np.ones(len(px), dtype=bool) if span is None else points.created >= np.datetime64(now - span)
+        for category, category_id in heatmap_categories().items():
+            mask = in_window if category_id is None else in_window & (points.category_ids == category_id)
+            _save_tile(render_heat(px[mask], py[mask]), tile_path(window, category, z, x, y))
+
+
+def render_tile(session: Session, z: int, x: int, y: int, now: datetime):
+    _render_points(_load_points(session, bbox_condition(Report, *tile_bounds(z, x, y))), z, x, y, now)
+
+
+def render_coarse_tiles(session: Session, tiles: list[tuple[int, int, int]], now: datetime):
+    """Low zoom tiles span too many grid cells for the cell prefilter, so each would scan the reports
+    table; read it once and cut every tile out of the arrays instead."""
+    points = _load_points(session)
+    for z, x, y in tiles:
+        min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+        mask = ((points.latitudes >= min_lat) & (points.latitudes <= max_lat)
+                & (points.longitudes >= min_lon) & (points.longitudes <= max_lon))
+        _render_points(points.select(mask), z, x, y, now)
+
+
+def _coordinates(session: Session, *conditions) -> tuple[np.ndarray, np.ndarray]:
+    rows = session.execute(select(Report.latitude, Report.longitude).where(*conditions)).all()
+    return (np.fromiter((row.latitude for row in rows), dtype=np.float64, count=len(rows)),
+            np.fromiter((row.longitude for row in rows), dtype=np.float64, count=len(rows)))
+
+
+def _pop_dirty(key: str) -> set[tuple[int, int, int]]:
+    tiles = set()
+    while batch := sync_redis_client.spop(key, DIRTY_BATCH):
+        tiles.update(tuple(int(part) for part in member.split("/")) for member in batch)
+    return tiles
+
+
+def _tile_member(tile: tuple[int, int, int]) -> str:
+    return "/".join(str(part) for part in tile)
+
+
+def _coarse_due(now: datetime) -> bool:
+    last_run = sync_redis_client.get(COARSE_LAST_RUN_KEY)
+    return last_run is None or now - datetime.fromisoformat(last_run) >= timedelta(seconds=HEATMAP_COARSE_REFRESH_SECONDS)
+
+
+def refresh_tiles() -> int:
+    """Re-render the tiles touched since the last run; the first run renders every populated tile.
+
+    A tile is touched when a report was inserted near it, or when a report near it has aged
+    out of one of the rolling windows. Zooms up to HEATMAP_COARSE_MAX_ZOOM are collected and
+    rendered every HEATMAP_COARSE_REFRESH_SECONDS only.
+    """
+    token = uuid.uuid4().hex
+    if not sync_redis_client.set(LOCK_KEY, token, nx=True, ex=LOCK_TTL):
+        return 0
+    try:
+        # Report.created is naive Israel time
+        now = israel_now()
+        last_run = sync_redis_client.get(LAST_RUN_KEY)
+        tiles = _pop_dirty(DIRTY_KEY)
+        coarse = set()
+        pending = []
+        try:
+            with sync_session_maker() as session:
+                if last_run is None:
+                    tiles |= touched_tiles(*_coordinates(session))
+                else:
+                    since = datetime.fromisoformat(last_run)
+                    expired = [and_(Report.created >= since - span, Report.created < now - span)
+                               for span in HEATMAP_WINDOWS.values() if span is not None]
+                    tiles |= touched_tiles(*_coordinates(session, or_(*expired)))
+                coarse = {tile for tile in tiles if tile[0] <= HEATMAP_COARSE_MAX_ZOOM}
+                tiles -= coarse
+                if last_run is None or _coarse_due(now):
+                    coarse |= _pop_dirty(COARSE_DIRTY_KEY)
+                    if coarse:
+                        render_coarse_tiles(session, sorted(coarse), now)
+                    sync_redis_client.set(COARSE_LAST_RUN_KEY, now.isoformat())
+                    tiles |= coarse
+                elif coarse:
+                    sync_redis_client.sadd(COARSE_DIRTY_KEY, *(_tile_member(tile) for tile in coarse))
+                    coarse = set()
+                pending = sorted(tiles - coarse)
+                while pending:
+                    render_tile(session, *pending[-1], now)
+                    pending.pop()
+        except Exception:
+            # Keep the remaining work for the next run
+            remaining = pending or sorted(tiles | coarse)
+            if remaining:
+                sync_redis_client.sadd(DIRTY_KEY, *(_tile_member(tile) for tile in remaining))
+            raise
+        sync_redis_client.set(LAST_RUN_KEY, now.isoformat())
+        return len(tiles)
+    finally:
+        sync_redis_client.eval(RELEASE_LOCK, 1, LOCK_KEY, token)
+
+
+def rebuild_tiles() -> int:
+    """Drop the tile cache and render it again from every report."""
+    sync_redis_client.delete(LAST_RUN_KEY, COARSE_LAST_RUN_KEY, COARSE_DIRTY_KEY)
+    shutil.rmtree(HEATMAP_TILE_DIR, ignore_errors=True)
+    return refresh_tiles()
+
+
+def _dirty_members(points: list[tuple[float, float]]) -> list[str]:
+    latitudes = np.array([lat for lat, _ in points], dtype=np.float64)
+    longitudes = np.array([lon for _, lon in points], dtype=np.float64)
+    return [_tile_member(tile) for tile in touched_tiles(latitudes, longitudes)]
+
+
+async def mark_points_dirty(points: list[tuple[float, float]]):
+    await redis_client.sadd(DIRTY_KEY, *_dirty_members(points))
+
+
+def mark_points_dirty_sync(points: list[tuple[float, float]]):
+    sync_redis_client.sadd(DIRTY_KEY, *_dirty_members(points))
+
+
+@event.listens_for(Report, "after_insert")
+def record_heat_point(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("heatmap_points", []).append((target.latitude, target.longitude))
+
+
+@event.listens_for(Session, "after_commit")
+def publish_heat_points(session):
+    points = session.info.pop("heatmap_points", None)
+    if points:
+        dispatch(mark_points_dirty, mark_points_dirty_sync, points)
+
+
+@event.listens_for(Session, "after_rollback")
+def drop_heat_points(session):
+    session.info.pop("heatmap_points", None)
@@ -0,0 +1,235 @@
+import os
+import time
+from datetime import timedelta
+from uuid import uuid4
+from fastapi import UploadFile
+from sqlalchemy import event, update, select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import get_history
+from app.configurations.database import sync_session_maker
+from app.models.models import StoredImage, ImageReport, User, israel_now
+from app.configurations.config import UPLOAD_SPOOL_BYTES
+from app.utils.uploads import stream_upload, write_temp, UPLOAD_DIR
+
+STORE_DIR = os.path.join(UPLOAD_DIR, "images")
+UNREFERENCED_GRACE = timedelta(days=1)
+
+
+def content_path(sha256: str, ext: str) -> str:
+    return os.path.join(STORE_DIR, sha256[:2], f"{sha256}{ext}")
+
+
+def is_stored(path: str | None) -> bool:
+    return bool(path) and path.startswith(STORE_DIR)
+
+
+async def store_upload(file: UploadFile) -> str:
+    """Save an upload under its content hash.
+
+    Uploads up to UPLOAD_SPOOL_BYTES are hashed in memory, so a duplicate of one costs no disk
+    write; larger ones are streamed to a temp file first to keep memory per request bounded.
+    """
+    upload = await stream_upload(file, UPLOAD_DIR, UPLOAD_SPOOL_BYTES)
+    path = content_path(upload.sha256, upload.ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if upload.path is None:
+        if _touch(path):
+            return path
+        upload.path = await write_temp(upload.data, UPLOAD_DIR)
+    try:
+        # link() fails if the content is already there, so concurrent duplicates keep one copy
+        _link(upload.path, path)
+    finally:
+        os.remove(upload.path)
+    return path
+
+
+def _touch(path: str) -> bool:
+    # Claims existing content against collection, see _remove_unless_touched
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _link(source: str, path: str):
+    for _ in range(2):
+        try:
+            os.link(source, path)
+            return
+        except FileExistsError:
+            pass
+        if _touch(path):
+            return
+        # Collected between link() and here: link our copy instead
+    raise FileNotFoundError(f"Could not store {path}: it keeps disappearing")
+
+
+async def unprocessed_images(session: AsyncSession, paths: list[str]) -> list[str]:
+    """Stored paths that still have no variants, whether their file is new or left by a failed request."""
+    if not paths:
+        return []
+    result = await session.execute(
+        select(StoredImage.path).where(StoredImage.path.in_(set(paths)), StoredImage.variants.is_(None))
+    )
+    return list(result.scalars())
+
+
+def _acquire(connection, path: str | None):
+    if not is_stored(path):
+        return
+    connection.execute(
+        pg_insert(StoredImage)
+        .values(path=path, refcount=1, updated=israel_now())
+        .on_conflict_do_update(index_elements=[StoredImage.path],
+                               set_={"refcount": StoredImage.refcount + 1, "updated": israel_now()})
+    )
+
+
+def _release(connection, path: str | None):
+    if not is_stored(path):
+        return
+    connection.execute(
+        update(StoredImage).where(StoredImage.path == path).values(refcount=StoredImage.refcount - 1)
+    )
+
+
+def _swap(connection, target, attribute: str):
+    history = get_history(target, attribute)
+    if not history.has_changes():
+        return
+    for old in history.deleted:
+        _release(connection, old)
+    for new in history.added:
+        _acquire(connection, new)
+
+
+@event.listens_for(ImageReport, "after_insert")
+def acquire_report_image(mapper, connection, target):
+    _acquire(connection, target.url)
+
+
+@event.listens_for(ImageReport, "after_update")
+def swap_report_image(mapper, connection, target):
+    _swap(connection, target, "url")
+
+
+@event.listens_for(ImageReport, "after_delete")
+def release_report_image(mapper, connection, target):
+    _release(connection, target.url)
+
+
+@event.listens_for(User, "after_insert")
+def acquire_user_photo(mapper, connection, target):
+    _acquire(connection, target.photo)
+
+
+@event.listens_for(User, "after_update")
+def swap_user_photo(mapper, connection, target):
+    _swap(connection, target, "photo")
+
+
+@event.listens_for(User, "after_delete")
+def release_user_photo(mapper, connection, target):
+    _release(connection, target.photo)
+
+
+def record_variants(results: dict[str, dict]):
+    # The worker may finish before the request that references the file has committed
+    with sync_session_maker() as session:
+        for path, variants in results.items():
+            session.execute(
+                pg_insert(StoredImage)
+                .values(path=path, refcount=0, variants=variants, updated=israel_now())
+                .on_conflict_do_update(index_elements=[StoredImage.path], set_={"variants": variants})
+            )
+        session.commit()
+
+
+def _remove_unless_touched(path: str, cutoff: float) -> bool:
+    """Unlink a stored original unless a duplicate upload touched it after `cutoff`.
+
+    The file is renamed away first, so an upload either touched it before the rename (and the
+    mtime below shows it) or finds it missing and links its own copy.
+    """
+    trash = f"{path}.{uuid4().hex}.gc"
+    try:
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return True
+    if os.stat(trash).st_mtime >= cutoff:
+        try:
+            os.link(trash, path)
+        except FileExistsError:
+            # The upload already linked its own copy
+            pass
+        os.remove(trash)
+        return False
+    os.remove(trash)
+    return True
+
+
+def _remove_files(paths: list[str]):
+    for file in paths:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def _base_path(file: str) -> str:
+    # <sha256><ext> or <sha256>_<variant><ext> -> the shard directory and hash
+    name = os.path.basename(file)
+    return os.path.join(os.path.dirname(file), name.split("_")[0].split(".")[0])
+
+
+def collect_unreferenced() -> list[str]:
+    """Delete stored images nobody has referenced for UNREFERENCED_GRACE.
+
+    Rows go first and files only after the commit, so a failed run never leaves a row without its file.
+    """
+    with sync_session_maker() as session:
+        rows = session.execute(
+            delete(StoredImage)
+            .where(StoredImage.refcount <= 0, StoredImage.updated < israel_now() - UNREFERENCED_GRACE)
+            .returning(StoredImage.path, StoredImage.variants)
+        ).all()
+        session.commit()
+    cutoff = time.time() - UNREFERENCED_GRACE.total_seconds()
+    removed = []
+    for path, variants in rows:
+        # A duplicate upload that touched the file is about to reference it again; its variants
+        # are rendered anew because the recreated row has none
+        if not _remove_unless_touched(path, cutoff):
+            continue
+        _remove_files([f for encodings in (variants or {}).values() for f in encodings.values()])
+        removed.append(path)
+    return removed + collect_orphans()
+
+
+def collect_orphans() -> list[str]:
+    """Delete files older than UNREFERENCED_GRACE that have no StoredImage row, left by failed requests."""
+    cutoff = time.time() - UNREFERENCED_GRACE.total_seconds()
+    removed = []
+    if not os.path.isdir(STORE_DIR):
+        return removed
+    with sync_session_maker() as session:
+        for shard in os.scandir(STORE_DIR):
+            if not shard.is_dir():
+                continue
+            old_files = [entry.path for entry in os.scandir(shard.path)
+                         if entry.is_file() and entry.stat().st_mtime < cutoff]
+            if not old_files:
+                continue
+            known = {_base_path(path) for path in session.scalars(
+                select(StoredImage.path).where(StoredImage.path.startswith(shard.path + os.sep))
+            )}
+            for file in old_files:
+                if _base_path(file) in known:
+                    continue
+                if "_" in os.path.basename(file):
+                    _remove_files([file])
+                elif not _remove_unless_touched(file, cutoff):
+                    continue
+                removed.append(file)
+    return removed
@@ -0,0 +1,88 @@
+import os
+from typing import Optional
+from PIL import Image, ImageOps
+
+# Square derivatives, largest first so each one is resampled from the previous
+VARIANT_SIZES = {
+    "full": 1024,
+    "popup": 320,
+    "thumb": 160,
+}
+FORMAT_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "webp": ".webp",
+    "avif": ".avif",
+}
+# Best first: the order <picture> offers the encodings in, JPEG being the <img> fallback
+FORMAT_PREFERENCE = ("avif", "webp", "jpeg")
+FORMAT_MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+def available_formats() -> list[str]:
+    Image.init()
+    return [fmt for fmt in FORMAT_EXTENSIONS if fmt.upper() in Image.SAVE]
+
+
+def variant_path(path: str, name: str, fmt: str) -> str:
+    root, _ = os.path.splitext(path)
+    return f"{root}_{name}{FORMAT_EXTENSIONS[fmt]}"
+
+
+def pick_variant(path: Optional[str], variants: Optional[dict], name: str, fmt: Optional[str] = None) -> Optional[str]:
+    """URL of the requested derivative, falling back to the original until the worker has produced it."""
+    encodings = (variants or {}).get(name)
+    if not encodings:
+        return path
+    if fmt:
+        return encodings.get(fmt, path)
+    # A plain <img src> must load in every browser; AVIF/WebP are offered through variant_sources
+    return encodings.get("jpeg", path)
+
+
+def variant_sources(variants: Optional[dict], name: str) -> list[tuple[str, str]]:
+    """(mime type, URL) of the encodings better than JPEG, best first, for <picture><source> tags."""
+    encodings = (variants or {}).get(name) or {}
+    return [(FORMAT_MIME_TYPES[fmt], encodings[fmt]) for fmt in FORMAT_PREFERENCE
+            if fmt != "jpeg" and fmt in encodings]
+
+
+SAVE_OPTIONS = {
+    "jpeg": {"quality": 85, "optimize": True, "progressive": True},
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60},
+}
+
+
+def _decode(original: Image.Image, size: int) -> Image.Image:
+    if original.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+        original.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(original)
+    factor = min(img.size) // size
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+    return img
+
+
+def render_variants(path: str) -> dict[str, dict[str, str]]:
+    """Decode the original once and write every size/format derivative next to it."""
+    formats = available_formats()
+    variants = {}
+    with Image.open(path) as original:
+        img = _decode(original, max(VARIANT_SIZES.values()))
+    for name, size in VARIANT_SIZES.items():
+        img = ImageOps.fit(img, (size, size), method=Image.Resampling.LANCZOS)
+        encodings = {}
+        for fmt in formats:
+            target = variant_path(path, name, fmt)
+            frame = img.convert("RGB") if fmt == "jpeg" else img
+            frame.save(target, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+            encodings[fmt] = target
+        variants[name] = encodings
+    return variants
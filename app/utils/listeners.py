@@ -0,0 +1,19 @@
+import importlib
+
+# Modules whose SQLAlchemy event listeners keep caches, counters and derived tables in step with the rows.
+# Listeners are registered on import, so every process that writes through the ORM must import all of them.
+LISTENER_MODULES = (
+    "app.auth.principal",
+    "app.utils.activity_rollup",
+    "app.utils.counters",
+    "app.utils.dashboard_cache",
+    "app.utils.heatmap",
+    "app.utils.image_store",
+    "app.utils.recent_reports",
+)
+
+
+def register_listeners():
+    """Import every listener module; safe to call more than once."""
+    for module in LISTENER_MODULES:
+        importlib.import_module(module)
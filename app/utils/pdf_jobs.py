@@ -0,0 +1,142 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.configurations.config import PDF_CACHE_DIR, PDF_CACHE_TTL, PDF_IMAGE_CONCURRENCY
+from app.configurations.database import sync_session_maker
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import Report
+from app.utils.pdf_report import build_report_pdf, report_payload
+
+PDF_WINDOW = timedelta(hours=24)
+ARTIFACT_PREFIX = "pdf:artifact:"
+JOB_PREFIX = "pdf:job:"
+JOB_ID_PREFIX = "pdf:job_id:"
+JOB_LOCK_TTL = 10 * 60  # seconds before a lost render may be scheduled again
+
+
+@dataclass
+class PdfArtifact:
+    key: str
+    window_start: datetime
+    max_id: Optional[int]
+    path: Optional[str] = None
+    job_id: Optional[str] = None
+
+
+def window_start(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) - PDF_WINDOW
+
+
+def version_query(start: datetime):
+    # Changes whenever a report enters, leaves or is edited inside the window
+    return select(func.count(Report.id), func.min(Report.id), func.max(Report.id), func.max(Report.updated)) \
+        .where(Report.created >= start)
+
+
+def artifact_key(count: int, min_id: Optional[int], max_id: Optional[int], updated: Optional[datetime]) -> str:
+    stamp = updated.strftime("%Y%m%d%H%M%S%f") if updated else "0"
+    return f"24h-{count}-{min_id or 0}-{max_id or 0}-{stamp}"
+
+
+def artifact_path(key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+
+def _cached_path(path: Optional[str]) -> Optional[str]:
+    return path if path and os.path.exists(path) else None
+
+
+async def find_or_schedule(session: AsyncSession, schedule) -> PdfArtifact:
+    """Return the cached PDF for the current data version, or the id of the job rendering it.
+
+    `schedule(window_start_iso, max_id, key, job_id)` enqueues the render under the given Celery task id.
+    """
+    start = window_start()
+    count, min_id, max_id, updated = (await session.execute(version_query(start))).one()
+    artifact = PdfArtifact(key=artifact_key(count, min_id, max_id, updated), window_start=start, max_id=max_id)
+    job_id = str(uuid.uuid4())
+    try:
+        artifact.path = _cached_path(await redis_client.get(f"{ARTIFACT_PREFIX}{artifact.key}"))
+        if artifact.path:
+            return artifact
+        # Single flight: the id is claimed atomically, only the request that wins the claim schedules the render
+        job_key = f"{JOB_PREFIX}{artifact.key}"
+        if not await redis_client.set(job_key, job_id, nx=True, ex=JOB_LOCK_TTL):
+            artifact.job_id = await redis_client.get(job_key)
+            if artifact.job_id:
+                return artifact
+            # The render finished (and dropped the claim) between SET and GET
+            artifact.path = _cached_path(await redis_client.get(f"{ARTIFACT_PREFIX}{artifact.key}"))
+            if artifact.path:
+                return artifact
+            if not await redis_client.set(job_key, job_id, nx=True, ex=JOB_LOCK_TTL):
+                artifact.job_id = await redis_client.get(job_key)
+                return artifact
+        # Lets the job endpoint tell an unknown or expired id from a queued one
+        await redis_client.set(f"{JOB_ID_PREFIX}{job_id}", artifact.key, ex=PDF_CACHE_TTL)
+        artifact.job_id = schedule(start.isoformat(), max_id, artifact.key, job_id)
+    except RedisError:
+        artifact.path = _cached_path(artifact_path(artifact.key))
+        if not artifact.path:
+            artifact.job_id = schedule(start.isoformat(), max_id, artifact.key, job_id)
+    return artifact
+
+
+async def job_exists(job_id: str) -> bool:
+    try:
+        return bool(await redis_client.exists(f"{JOB_ID_PREFIX}{job_id}"))
+    except RedisError:
+        # Cannot tell, keep the client polling
+        return True
+
+
+def current_version() -> tuple[datetime, Optional[int], str]:
+    start = window_start()
+    with sync_session_maker() as session:
+        count, min_id, max_id, updated = session.execute(version_query(start)).one()
+    return start, max_id, artifact_key(count, min_id, max_id, updated)
+
+
+def render_artifact(start: datetime, max_id: Optional[int], key: str) -> str:
+    path = artifact_path(key)
+    if _cached_path(path):
+        sync_redis_client.set(f"{ARTIFACT_PREFIX}{key}", path, ex=PDF_CACHE_TTL)
+        return path
+    with sync_session_maker() as session:
+        query = select(Report).options(selectinload(Report.images)).where(Report.created >= start)
+        if max_id is not None:
+            # Render exactly the version the key was computed for
+            query = query.where(Report.id <= max_id)
+        reports = session.execute(query.order_by(Report.created.desc())).scalars().unique().all()
+        payload = report_payload(
+            reports,
+            lambda report: [image.url for image in report.images if image.url],
+            PDF_IMAGE_CONCURRENCY,
+        )
+    content = build_report_pdf(payload)
+
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    temp_path = f"{path}.part"
+    with open(temp_path, "wb") as pdf_file:
+        pdf_file.write(content)
+    os.replace(temp_path, path)
+    sync_redis_client.set(f"{ARTIFACT_PREFIX}{key}", path, ex=PDF_CACHE_TTL)
+    sync_redis_client.delete(f"{JOB_PREFIX}{key}")
+    remove_expired_artifacts()
+    return path
+
+
+def remove_expired_artifacts():
+    cutoff = time.time() - PDF_CACHE_TTL
+    for name in os.listdir(PDF_CACHE_DIR):
+        path = os.path.join(PDF_CACHE_DIR, name)
+        # Print resolution images stay, they are keyed by content and reused across days
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PIL import Image, ImageOps
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas as canvas_module
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, Image as PlatypusImage
+from app.configurations.config import PDF_CACHE_DIR, PDF_IMAGE_DPI, PDF_IMAGE_QUALITY
+
+UPLOAD_ROOT = os.path.normpath("app/uploads")
+PRINT_CACHE_DIR = os.path.join(PDF_CACHE_DIR, "images")
+# Box every photo is placed in, in points
+IMAGE_WIDTH = 80 * mm
+IMAGE_HEIGHT = 60 * mm
+
+
+def local_image_path(url: str) -> str:
+    path = os.path.normpath(url.lstrip("/"))
+    if path != UPLOAD_ROOT and not path.startswith(UPLOAD_ROOT + os.sep):
+        raise ValueError(f"{url} is outside the upload store")
+    return path
+
+
+def print_size(dpi: int) -> tuple[int, int]:
+    # Pixels needed to fill the placed box at the given resolution (72 points per inch)
+    return round(IMAGE_WIDTH / 72 * dpi), round(IMAGE_HEIGHT / 72 * dpi)
+
+
+def prepare_print_image(url: str, dpi: int = PDF_IMAGE_DPI, quality: int = PDF_IMAGE_QUALITY) -> bytes:
+    """Resample a stored photo to print resolution for its placed size, cached per image and DPI."""
+    source = local_image_path(url)
+    cached = os.path.join(PRINT_CACHE_DIR, f"{hashlib.sha1(source.encode()).hexdigest()}_{dpi}.jpg")
+    if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(source):
+        with open(cached, "rb") as cached_file:
+            return cached_file.read()
+
+    size = print_size(dpi)
+    with Image.open(source) as original:
+        original.draft("RGB", size)
+        img = ImageOps.exif_transpose(original)
+    img.thumbnail(size, Image.Resampling.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    data = buffer.getvalue()
+
+    os.makedirs(PRINT_CACHE_DIR, exist_ok=True)
+    temp_path = f"{cached}.{os.getpid()}.part"
+    with open(temp_path, "wb") as cached_file:
+        cached_file.write(data)
+    os.replace(temp_path, cached)
+    return data
+
+
+def _read_image(url: str) -> dict:
+    try:
+        return {"data": prepare_print_image(url)}
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def load_images(urls: list[str], concurrency: int) -> list[dict]:
+    """Load print-ready image bytes from the upload store, at most `concurrency` files at a time."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="pdf-io") as executor:
+        return list(executor.map(_read_image, urls))
+
+
+def report_payload(reports, image_urls, concurrency: int) -> list[dict]:
+    # Plain data for build_report_pdf; image_urls(report) lists the files to embed for one report
+    per_report = [image_urls(report) for report in reports]
+    loaded = iter(load_images([url for urls in per_report for url in urls], concurrency))
+    return [
+        {
+            "title": report.title,
+            "latitude": report.latitude,
+            "longitude": report.longitude,
+            "created": report.created,
+            "images": [next(loaded) for _ in urls],
+        }
+        for report, urls in zip(reports, per_report)
+    ]
+
+
+# Footer function
+def add_footer(canvas: canvas_module.Canvas, doc):
+    page_num_text = f"Page {doc.page}"
+    footer_text = f"Generated by FastAPI • {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
+
+    canvas.saveState()
+    canvas.setFont("Helvetica", 9)
+
+    canvas.drawString(40, 20, footer_text)
+    canvas.drawRightString(A4[0] - 40, 20, page_num_text)
+
+    canvas.restoreState()
+
+
+def build_report_pdf(reports: list[dict]) -> bytes:
+    """Render the report PDF.
+
+    `reports` holds plain dicts (title, latitude, longitude, created, images) as built by
+    report_payload; every image is {"data": bytes} or {"error": message}.
+    """
+    buffer = io.BytesIO()
+
+    # Set up custom template with footer
+    doc = BaseDocTemplate(buffer, pagesize=A4)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height - 20, id="normal")
+    template = PageTemplate(id="footer_template", frames=frame, onPage=add_footer)
+    doc.addPageTemplates([template])
+
+    styles = getSampleStyleSheet()
+    elements = []
+
+    report_count = 0
+    image_count = 0
+
+    elements.append(Paragraph("📄 Reports in the Last 24 Hours", styles["Title"]))
+    elements.append(Spacer(1, 12))
+
+    for report in reports:
+        report_count += 1
+        data = [
+            ["Title", report["title"]],
+            ["Location", f"({report['latitude']}, {report['longitude']})"],
+            ["Created", report["created"].strftime('%Y-%m-%d %H:%M:%S')],
+        ]
+        table = Table(data, colWidths=[70 * mm, 100 * mm])
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
+            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+            ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ]))
+        elements.append(table)
+        elements.append(Spacer(1, 6))
+
+        for image in report["images"]:
+            if "data" in image:
+                img = PlatypusImage(io.BytesIO(image["data"]), width=IMAGE_WIDTH, height=IMAGE_HEIGHT,
+                                    kind="proportional")
+                elements.append(img)
+                elements.append(Spacer(1, 6))
+                image_count += 1
+            else:
+                elements.append(Paragraph(f"<i>Error loading image: {image['error']}</i>", styles["Normal"]))
+
+        elements.append(Spacer(1, 18))
+
+    elements.append(Paragraph("📊 Summary", styles["Heading2"]))
+    summary_data = [["Total Reports", str(report_count)], ["Total Images", str(image_count)]]
+    summary_table = Table(summary_data, colWidths=[70 * mm, 100 * mm])
+    summary_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
+        ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 11),
+        ("BOX", (0, 0), (-1, -1), 0.5, colors.black),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ]))
+    elements.append(summary_table)
+
+    doc.build(elements)
+    return buffer.getvalue()
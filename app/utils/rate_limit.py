@@ -0,0 +1,110 @@
+import hashlib
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from redis.exceptions import RedisError
+from app.configurations.config import RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE
+from app.configurations.config import RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PER_MINUTE, TRUST_PROXY_HEADERS
+from app.configurations.config import CLIENT_IP_HEADER
+from app.configurations.config import EMAIL_COOLDOWN_SECONDS
+from app.configurations.redis_config import redis_client
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+STATS_KEY = "ratelimit:stats"
+EMAIL_PENDING_PREFIX = "email:pending:"
+
+# Token bucket kept in a hash {tokens, ts}; refilled lazily from the Redis clock on every call.
+# Returns {allowed, milliseconds until a token is available}.
+# Writing after the non-deterministic TIME call needs effects replication, the default since Redis 5
+# (the compose file runs redis:7); on older servers the script would be rejected.
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local per_ms = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * per_ms)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / per_ms)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / per_ms))
+return {allowed, wait}
+"""
+
+
+def email_digest(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+def client_ip(request: Request) -> str:
+    # nginx overwrites X-Real-IP with the client address it resolved from Cloudflare's CF-Connecting-IP,
+    # so it cannot be forged through the proxy; without that every visitor would share an edge address
+    if TRUST_PROXY_HEADERS and request.headers.get(CLIENT_IP_HEADER):
+        return request.headers[CLIENT_IP_HEADER]
+    return request.client.host if request.client else "unknown"
+
+
+async def take_token(key: str, burst: int, per_minute: int) -> tuple[bool, int]:
+    allowed, wait_ms = await redis_client.eval(TOKEN_BUCKET, 1, f"{RATE_LIMIT_PREFIX}{key}", burst,
+                                               per_minute / 60000)
+    return bool(allowed), int(wait_ms)
+
+
+async def check_auth_rate(request: Request, scope: str, email: Optional[str] = None) -> Optional[PlainTextResponse]:
+    """Spend one token from the caller's IP bucket and the target email's bucket.
+
+    Returns a 429 response when either is empty; call it before any password hashing.
+    Redis being unavailable lets the request through.
+    """
+    buckets = [("ip", client_ip(request), RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE)]
+    if email:
+        buckets.append(("email", email_digest(email), RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PER_MINUTE))
+    try:
+        for kind, subject, burst, per_minute in buckets:
+            allowed, wait_ms = await take_token(f"{scope}:{kind}:{subject}", burst, per_minute)
+            if not allowed:
+                await redis_client.hincrby(STATS_KEY, f"{scope}:{kind}:rejected", 1)
+                retry_after = max(1, -(-wait_ms // 1000))
+                return PlainTextResponse("Too many attempts, try again later.", status_code=429,
+                                         headers={"Retry-After": str(retry_after)})
+        await redis_client.hincrby(STATS_KEY, f"{scope}:allowed", 1)
+    except RedisError as e:
+        print(f"❌ Rate limiter unavailable, allowing {scope}: {e}")
+    return None
+
+
+async def claim_email_send(purpose: str, email: str) -> bool:
+    """True when no `purpose` email went to this address within EMAIL_COOLDOWN_SECONDS.
+
+    A False answer means the earlier send is still pending or was just delivered, and the caller
+    should reuse it instead of queuing another. Redis being unavailable lets the send through.
+    """
+    try:
+        if await redis_client.set(f"{EMAIL_PENDING_PREFIX}{purpose}:{email_digest(email)}", "1",
+                                  nx=True, ex=EMAIL_COOLDOWN_SECONDS):
+            return True
+        await redis_client.hincrby(STATS_KEY, f"{purpose}_email:coalesced", 1)
+        return False
+    except RedisError as e:
+        print(f"❌ Email cooldown unavailable, sending {purpose} email: {e}")
+        return True
+
+
+async def release_email_send(purpose: str, email: str):
+    # The send was never queued, let the next attempt through
+    try:
+        await redis_client.delete(f"{EMAIL_PENDING_PREFIX}{purpose}:{email_digest(email)}")
+    except RedisError:
+        pass
+
+
+async def rate_limit_stats() -> dict[str, int]:
+    return {field: int(value) for field, value in (await redis_client.hgetall(STATS_KEY)).items()}
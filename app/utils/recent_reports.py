@@ -0,0 +1,76 @@
+from typing import List
+import orjson
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlalchemy import select, desc, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.configurations.config import RECENT_REPORTS_LIMIT, RECENT_REPORTS_TTL
+from app.configurations.database import get_async_session
+from app.configurations.redis_config import redis_client, sync_redis_client
+from app.models.models import Report, User, StoredImage
+from app.schemas.schemas import RecentReport
+from app.utils.after_commit import dispatch
+from app.utils.image_variants import pick_variant
+
+RECENT_REPORTS_KEY = "feed:recent_reports"
+
+
+async def load_recent_reports(session: AsyncSession, limit: int = RECENT_REPORTS_LIMIT) -> List[RecentReport]:
+    # Only the columns the sidebar shows, capped to the last few reports
+    result = await session.execute(
+        select(Report.id, Report.title, Report.created, User.photo, User.firstname, User.lastname,
+               StoredImage.variants)
+        .join(User, Report.user_id == User.id)
+        .outerjoin(StoredImage, StoredImage.path == User.photo)
+        .order_by(desc(Report.created), desc(Report.id))
+        .limit(limit)
+    )
+    return [
+        RecentReport(id=row.id, title=row.title, created=row.created,
+                     user={"photo": pick_variant(row.photo, row.variants, "thumb"),
+                           "firstname": row.firstname, "lastname": row.lastname})
+        for row in result
+    ]
+
+
+async def get_recent_reports(session: AsyncSession = Depends(get_async_session)) -> List[RecentReport]:
+    try:
+        cached = await redis_client.get(RECENT_REPORTS_KEY)
+    except RedisError:
+        return await load_recent_reports(session)
+    if cached is not None:
+        return [RecentReport.model_validate(item) for item in orjson.loads(cached)]
+    reports = await load_recent_reports(session)
+    payload = orjson.dumps([report.model_dump(mode="json") for report in reports])
+    try:
+        await redis_client.set(RECENT_REPORTS_KEY, payload, ex=RECENT_REPORTS_TTL)
+    except RedisError:
+        pass
+    return reports
+
+
+async def invalidate_recent_reports():
+    await redis_client.delete(RECENT_REPORTS_KEY)
+
+
+def invalidate_recent_reports_sync():
+    sync_redis_client.delete(RECENT_REPORTS_KEY)
+
+
+@event.listens_for(Report, "after_insert")
+def mark_recent_reports_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["recent_reports_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def drop_stale_recent_reports(session):
+    if session.info.pop("recent_reports_stale", False):
+        dispatch(invalidate_recent_reports, invalidate_recent_reports_sync)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_recent_reports(session):
+    session.info.pop("recent_reports_stale", None)
@@ -0,0 +1,158 @@
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+from queue import LifoQueue, Empty, Full
+from typing import Iterable
+from app.configurations.config import MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, MAIL_FROM, MAIL_FROM_NAME
+from app.configurations.config import MAIL_STARTTLS, MAIL_SSL_TLS, MAIL_VALIDATE_CERTS
+from app.configurations.config import SMTP_POOL_SIZE, SMTP_TIMEOUT, SMTP_MAX_IDLE, SMTP_CHECK_IDLE
+
+# The connection is gone or unusable: drop it and retry on a fresh one
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPHeloError,
+                    ConnectionError, TimeoutError)
+
+
+def build_message(recipients: list[str], subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((MAIL_FROM_NAME or MAIL_USERNAME or "", MAIL_FROM))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+    return message
+
+
+class _TrackedData:
+    # Once DATA is sent the server may have accepted the message, so it must not be retried
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+class PooledSMTP(_TrackedData, smtplib.SMTP):
+    pass
+
+
+class PooledSMTP_SSL(_TrackedData, smtplib.SMTP_SSL):
+    pass
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPPool:
+    """Logged-in SMTP sessions kept open across Celery tasks of one worker process."""
+
+    def __init__(self, size: int = SMTP_POOL_SIZE):
+        self._idle: LifoQueue[_Connection] = LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+
+    def _open(self) -> _Connection:
+        context = ssl.create_default_context()
+        if not MAIL_VALIDATE_CERTS:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if MAIL_SSL_TLS:
+            smtp = PooledSMTP_SSL(MAIL_SERVER, MAIL_PORT, timeout=SMTP_TIMEOUT, context=context)
+        else:
+            smtp = PooledSMTP(MAIL_SERVER, MAIL_PORT, timeout=SMTP_TIMEOUT)
+            if MAIL_STARTTLS:
+                smtp.starttls(context=context)
+        if MAIL_USERNAME and MAIL_PASSWORD:
+            smtp.login(MAIL_USERNAME, MAIL_PASSWORD)
+        return _Connection(smtp)
+
+    def _usable(self, connection: _Connection) -> bool:
+        idle = time.monotonic() - connection.last_used
+        if idle > SMTP_MAX_IDLE:
+            return False
+        if idle > SMTP_CHECK_IDLE:
+            try:
+                return connection.smtp.noop()[0] == 250
+            except (smtplib.SMTPException, OSError):
+                return False
+        return True
+
+    def _acquire(self) -> _Connection:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except Empty:
+                return self._open()
+            if self._usable(connection):
+                return connection
+            connection.close()
+
+    def _release(self, connection: _Connection):
+        connection.last_used = time.monotonic()
+        try:
+            self._idle.put_nowait(connection)
+        except Full:
+            connection.close()
+
+    @contextmanager
+    def connection(self):
+        connection = self._acquire()
+        try:
+            yield connection.smtp
+        except RECONNECT_ERRORS:
+            connection.smtp.close()
+            raise
+        except BaseException:
+            # Leave the session in a clean state for the next message
+            try:
+                connection.smtp.rset()
+                self._release(connection)
+            except (smtplib.SMTPException, OSError):
+                connection.smtp.close()
+            raise
+        self._release(connection)
+
+    def send(self, message: EmailMessage):
+        # A pooled session may have been dropped by the server since its last use. That surfaces at
+        # MAIL FROM, before anything was delivered, so it is retried once on a fresh session.
+        for attempt in range(2):
+            smtp = None
+            try:
+                with self.connection() as smtp:
+                    smtp.data_started = False
+                    smtp.send_message(message)
+                return
+            except RECONNECT_ERRORS:
+                if attempt or (smtp is not None and smtp.data_started):
+                    raise
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> list[tuple[EmailMessage, Exception]]:
+        """Send over one session, reconnecting when it drops; returns the messages that failed."""
+        failed = []
+        for message in messages:
+            try:
+                self.send(message)
+            except (smtplib.SMTPException, OSError) as e:
+                failed.append((message, e))
+        return failed
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except Empty:
+                    break
+
+
+smtp_pool = SMTPPool()
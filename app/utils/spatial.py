@@ -0,0 +1,93 @@
+import math
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Fixed lat/lon grid stored in Report.cell; changing it requires re-running the backfill
+CELL_DEGREES = 0.05  # ~5.5 km of latitude
+CELL_COLUMNS = round(360 / CELL_DEGREES)
+MAX_COVERING_CELLS = 1024  # beyond this a plain range filter is cheaper than a huge IN list
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def cell_id(latitude: float, longitude: float) -> int:
+    row = math.floor((latitude + 90) / CELL_DEGREES)
+    column = math.floor((longitude + 180) / CELL_DEGREES) % CELL_COLUMNS
+    return row * CELL_COLUMNS + column
+
+
+def covering_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Optional[list[int]]:
+    first_row, last_row = math.floor((min_lat + 90) / CELL_DEGREES), math.floor((max_lat + 90) / CELL_DEGREES)
+    first_col, last_col = math.floor((min_lon + 180) / CELL_DEGREES), math.floor((max_lon + 180) / CELL_DEGREES)
+    if (last_row - first_row + 1) * (last_col - first_col + 1) > MAX_COVERING_CELLS:
+        return None
+    return [row * CELL_COLUMNS + col % CELL_COLUMNS
+            for row in range(first_row, last_row + 1)
+            for col in range(first_col, last_col + 1)]
+
+
+def bbox_condition(model, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """Cell prefilter (uses the (cell, created) index) plus the exact coordinate range."""
+    conditions = [model.latitude.between(min_lat, max_lat), model.longitude.between(min_lon, max_lon)]
+    cells = covering_cells(min_lat, min_lon, max_lat, max_lon)
+    if cells is not None:
+        conditions.insert(0, model.cell.in_(cells))
+    return and_(*conditions)
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> tuple[float, float, float, float]:
+    delta_lat = radius_km / KM_PER_DEGREE
+    delta_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return (max(latitude - delta_lat, -90), longitude - delta_lon,
+            min(latitude + delta_lat, 90), longitude + delta_lon)
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def time_conditions(model, start_date: Optional[datetime], end_date: Optional[datetime]) -> list:
+    conditions = []
+    if start_date:
+        conditions.append(model.created >= start_date)
+    if end_date:
+        conditions.append(model.created <= end_date)
+    return conditions
+
+
+async def reports_in_bbox(session: AsyncSession, columns: list, min_lat: float, min_lon: float,
+                          max_lat: float, max_lon: float, start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None, limit: Optional[int] = None):
+    model = columns[0].class_
+    query = select(*columns).where(bbox_condition(model, min_lat, min_lon, max_lat, max_lon),
+                                   *time_conditions(model, start_date, end_date))
+    if limit:
+        query = query.order_by(model.created.desc()).limit(limit)
+    return (await session.execute(query)).all()
+
+
+async def reports_within(session: AsyncSession, columns: list, latitude: float, longitude: float,
+                         radius_km: float, start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None, limit: Optional[int] = None) -> list[tuple]:
+    """Rows within radius_km of the point as (row, distance_km), nearest first.
+
+    `columns` must start with a mapped column of the model and include its latitude and longitude.
+    """
+    rows = await reports_in_bbox(session, columns, *radius_bbox(latitude, longitude, radius_km),
+                                 start_date=start_date, end_date=end_date)
+    if not rows:
+        return []
+    latitudes = np.fromiter((row.latitude for row in rows), dtype=np.float64, count=len(rows))
+    longitudes = np.fromiter((row.longitude for row in rows), dtype=np.float64, count=len(rows))
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind="stable")]
+    if limit:
+        nearest = nearest[:limit]
+    return [(rows[i], float(distances[i])) for i in nearest]
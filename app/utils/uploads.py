@@ -0,0 +1,85 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+from uuid import uuid4
+import aiofiles
+from fastapi import UploadFile, HTTPException
+from app.configurations.config import UPLOAD_MAX_BYTES, UPLOAD_CHUNK_BYTES
+
+UPLOAD_DIR = "app/uploads/"
+
+
+@dataclass
+class StoredUpload:
+    # Exactly one of path (temp file) and data (kept in memory) is set
+    path: Optional[str]
+    sha256: str
+    size: int
+    ext: str
+    data: Optional[bytes] = None
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    # Trust the magic bytes, not the client supplied filename
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _temp_path(upload_dir: str) -> str:
+    return os.path.join(upload_dir, f"{uuid4().hex}.part")
+
+
+async def stream_upload(file: UploadFile, upload_dir: str = UPLOAD_DIR, spool_bytes: int = 0) -> StoredUpload:
+    """Stream an upload chunk by chunk, hashing it on the way and aborting past the size limit.
+
+    Uploads of at most `spool_bytes` stay in memory (`data`); larger ones go to a temp file (`path`).
+    """
+    temp_path = _temp_path(upload_dir)
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    buffer = bytearray()
+    out_file = None
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            if ext is None:
+                ext = sniff_image_type(chunk)
+                if ext is None:
+                    raise HTTPException(status_code=400, detail="Invalid image format")
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=400,
+                                    detail=f"File size exceeds the {UPLOAD_MAX_BYTES // (1024 * 1024)}MB limit")
+            digest.update(chunk)
+            if out_file is None and size <= spool_bytes:
+                buffer += chunk
+                continue
+            if out_file is None:
+                out_file = await aiofiles.open(temp_path, "wb")
+                await out_file.write(bytes(buffer))
+                buffer.clear()
+            await out_file.write(chunk)
+        if ext is None:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+    except BaseException:
+        if out_file is not None:
+            await out_file.close()
+            os.remove(temp_path)
+        raise
+    if out_file is None:
+        return StoredUpload(path=None, sha256=digest.hexdigest(), size=size, ext=ext, data=bytes(buffer))
+    await out_file.close()
+    return StoredUpload(path=temp_path, sha256=digest.hexdigest(), size=size, ext=ext)
+
+
+async def write_temp(data: bytes, upload_dir: str = UPLOAD_DIR) -> str:
+    temp_path = _temp_path(upload_dir)
+    async with aiofiles.open(temp_path, "wb") as out_file:
+        await out_file.write(data)
+    return temp_path
@@ -8,6 +8,10 @@ from alembic import context
 
 # Import your metadata
 from app.models.models import Base
+from app.utils.listeners import register_listeners
+
+# Data migrations that use ORM sessions keep caches and rollups in step
+register_listeners()
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,30 @@
+"""Keyset pagination indexes
+
+Revision ID: 3f9c1b7a2d41
+Revises: eade30ce64d9
+Create Date: 2026-10-18 09:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1b7a2d41'
+down_revision: Union[str, None] = 'eade30ce64d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reports_created_id', 'reports', ['created', 'id'], unique=False)
+    op.create_index('ix_users_created_id', 'users', ['created', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_id', table_name='users')
+    op.drop_index('ix_reports_created_id', table_name='reports')
@@ -0,0 +1,33 @@
+"""Content addressed image store
+
+Revision ID: 8a4e2c6d1f07
+Revises: 3f9c1b7a2d41
+Create Date: 2026-10-18 10:41:03.227915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e2c6d1f07'
+down_revision: Union[str, None] = '3f9c1b7a2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_images',
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('path')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stored_images')
@@ -0,0 +1,28 @@
+"""Stored image variants
+
+Revision ID: c5d8e1a94b32
+Revises: 8a4e2c6d1f07
+Create Date: 2026-10-18 11:27:51.604372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8e1a94b32'
+down_revision: Union[str, None] = '8a4e2c6d1f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stored_images', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('stored_images', 'variants')
@@ -0,0 +1,35 @@
+"""Report grid cell
+
+Revision ID: d7f3a9b5e210
+Revises: c5d8e1a94b32
+Create Date: 2026-10-18 12:04:13.218406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a9b5e210'
+down_revision: Union[str, None] = 'c5d8e1a94b32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reports', sa.Column('cell', sa.BigInteger(), nullable=True))
+    # Same grid as app.utils.spatial.cell_id (0.05 degree cells, 7200 columns)
+    op.execute(
+        "UPDATE reports SET cell = floor((latitude + 90) / 0.05)::bigint * 7200"
+        " + (floor((longitude + 180) / 0.05)::bigint % 7200)"
+    )
+    op.create_index('ix_reports_cell_created', 'reports', ['cell', 'created'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reports_cell_created', table_name='reports')
+    op.drop_column('reports', 'cell')
@@ -0,0 +1,42 @@
+"""Report activity rollup
+
+Revision ID: e2b6c4f8a915
+Revises: d7f3a9b5e210
+Create Date: 2026-10-18 12:41:36.502918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c4f8a915'
+down_revision: Union[str, None] = 'd7f3a9b5e210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('report_activity_rollup',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('reports', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'bucket', 'title')
+    )
+    # Same rows as app.utils.activity_rollup.backfill
+    for granularity in ('hour', 'day'):
+        op.execute(
+            "INSERT INTO report_activity_rollup (granularity, bucket, title, color, reports) "
+            f"SELECT '{granularity}', date_trunc('{granularity}', created), title, max(color), count(id) "
+            f"FROM reports GROUP BY date_trunc('{granularity}', created), title"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('report_activity_rollup')
@@ -0,0 +1,95 @@
+"""Report categories
+
+Revision ID: f4a1d2c7b803
+Revises: e2b6c4f8a915
+Create Date: 2026-10-18 13:18:05.947215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a1d2c7b803'
+down_revision: Union[str, None] = 'e2b6c4f8a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    categories = op.create_table('report_categories',
+    sa.Column('id', sa.SmallInteger(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('icon', sa.String(), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    # The values the old before_insert listeners wrote into every report
+    op.bulk_insert(categories, [
+        {'name': 'Civilian', 'icon': 'app/uploads/markers/civil.ico', 'color': '#1dff16'},
+        {'name': 'Suspect', 'icon': 'app/uploads/markers/suspect.ico', 'color': '#fd0808'},
+        {'name': 'Lebanon Forces', 'icon': 'app/uploads/markers/leb_solder.ico', 'color': '#232222'},
+        {'name': 'UN Forces', 'icon': 'app/uploads/markers/un_solder.ico', 'color': 'rgba(56,168,248,0.6)'},
+    ])
+    op.execute(
+        "INSERT INTO report_categories (name) "
+        "SELECT DISTINCT title FROM reports WHERE title NOT IN (SELECT name FROM report_categories)"
+    )
+
+    op.add_column('reports', sa.Column('category_id', sa.SmallInteger(), nullable=True))
+    op.execute("UPDATE reports SET category_id = c.id FROM report_categories c WHERE c.name = reports.title")
+    op.alter_column('reports', 'category_id', nullable=False)
+    op.create_foreign_key('reports_category_id_fkey', 'reports', 'report_categories', ['category_id'], ['id'])
+    op.create_index('ix_reports_category_created', 'reports', ['category_id', 'created'], unique=False)
+    op.drop_column('reports', 'icon')
+    op.drop_column('reports', 'color')
+
+    op.drop_table('report_activity_rollup')
+    op.create_table('report_activity_rollup',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('category_id', sa.SmallInteger(), nullable=False),
+    sa.Column('reports', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['report_categories.id'], ),
+    sa.PrimaryKeyConstraint('granularity', 'bucket', 'category_id')
+    )
+    for granularity in ('hour', 'day'):
+        op.execute(
+            "INSERT INTO report_activity_rollup (granularity, bucket, category_id, reports) "
+            f"SELECT '{granularity}', date_trunc('{granularity}', created), category_id, count(id) "
+            f"FROM reports GROUP BY date_trunc('{granularity}', created), category_id"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('report_activity_rollup')
+    op.create_table('report_activity_rollup',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('reports', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'bucket', 'title')
+    )
+
+    op.add_column('reports', sa.Column('color', sa.String(), nullable=True))
+    op.add_column('reports', sa.Column('icon', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE reports SET icon = c.icon, color = c.color FROM report_categories c WHERE c.id = reports.category_id"
+    )
+    op.drop_index('ix_reports_category_created', table_name='reports')
+    op.drop_constraint('reports_category_id_fkey', 'reports', type_='foreignkey')
+    op.drop_column('reports', 'category_id')
+    op.drop_table('report_categories')
+
+    for granularity in ('hour', 'day'):
+        op.execute(
+            "INSERT INTO report_activity_rollup (granularity, bucket, title, color, reports) "
+            f"SELECT '{granularity}', date_trunc('{granularity}', created), title, max(color), count(id) "
+            f"FROM reports GROUP BY date_trunc('{granularity}', created), title"
+        )